@@ -25,6 +25,9 @@ async def lifespan(app: FastAPI):
     # DB tables
     Base.metadata.create_all(bind=engine)
 
+    # Tweet-bot persona, resolved once (hot-reload via POST /rag/bot_config)
+    app.state.bot_cfg = rag.load_bot_cfg()
+
     # Optional: build the vector DB from local JSON files at startup
     if _truthy(os.getenv("RAG_AUTO_INDEX", "false")):
         docs_dir = os.getenv("RAG_DOCS_DIR") or os.getenv("DOCS_DIR", "/data/json")
@@ -45,6 +48,8 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    await rag.aclose_ollama_client()
+
 
 def create_app() -> FastAPI:
     app = FastAPI(lifespan=lifespan)
@@ -8,6 +8,7 @@ from pathlib import Path
 from typing import Any
 
 import chromadb
+import numpy as np
 import requests
 
 logger = logging.getLogger(__name__)
@@ -444,6 +445,18 @@ def embed_texts(texts: list[str]) -> list[list[float]]:
     return embeddings
 
 
+def embed_query(question: str) -> np.ndarray:
+    """Embed a single query string with the retrieval embedding model.
+
+    Returns a 1-D float32 vector (not normalized). Unlike `embed_texts`,
+    this does a single attempt so callers on the request path fail fast.
+    """
+    cleaned = (question or "").strip()
+    if not cleaned:
+        raise ValueError("question must be a non-empty string")
+    return np.asarray(_embed_with_ollama(cleaned), dtype=np.float32)
+
+
 # -------------------------------------------------------------------
 # Ingestion
 # -------------------------------------------------------------------
@@ -482,10 +495,16 @@ def add_document(text: str) -> None:
 # -------------------------------------------------------------------
 
 
-def query_similar_chunks(question, top_k=3):
+def query_similar_chunks(question, top_k=3, *, query_embedding=None):
     """
     Embed the question, query Chroma, and return a list of RAGChunk.
 
+    Chunks are returned in Chroma's order, i.e. sorted by ascending distance
+    (nearest first); callers rely on this and do not re-sort.
+
+    If `query_embedding` is given (e.g. from `embed_query`), it is used as-is
+    and the question is not embedded again.
+
     Tests expect:
 
         query_similar_chunks(question: str, top_k: int = 3) -> list[RAGChunk]
@@ -511,7 +530,10 @@ def query_similar_chunks(question, top_k=3):
     if not cleaned:
         return []
 
-    query_embeddings = embed_texts([cleaned])
+    if query_embedding is not None:
+        query_embeddings = [[float(x) for x in query_embedding]]
+    else:
+        query_embeddings = embed_texts([cleaned])
     if not query_embeddings:
         # Could happen if embedding fails; in that case, just return empty.
         return []
@@ -1,30 +1,59 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
 from http import HTTPStatus
 from typing import Any, Literal
 import json
 from datetime import datetime, timedelta
+from functools import lru_cache
 from zoneinfo import ZoneInfo
+import httpx
 import rag_store
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import hashlib
 import random
+import numpy as np
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 from rag_store import RAGChunk
 from weather_service import *
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/rag", tags=["rag"])
+router = APIRouter(prefix="/rag", tags=["rag"], default_response_class=ORJSONResponse)
 
 _WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
 
-# Use a module-level session so tests can monkeypatch it.
+# Use a module-level session so tests can monkeypatch it (live weather lookups).
+# Pool sized for concurrent /rag/query requests (threadpool); transient upstream
+# errors on these idempotent GETs are retried with backoff.
 _session = requests.Session()
+_session_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=("GET",),
+    ),
+)
+_session.mount("http://", _session_adapter)
+_session.mount("https://", _session_adapter)
+
+# Async client for Ollama chat; created lazily and closed from the app lifespan.
+_aclient: httpx.AsyncClient | None = None
 
 
 
@@ -203,6 +232,27 @@ class QueryResponse(BaseModel):
     audit: AuditResult | None = None
 
 
+class BatchQueryRequest(BaseModel):
+    items: list[QueryRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=64,
+        description="Queries to answer concurrently (bounded by OLLAMA_NUM_PARALLEL).",
+    )
+
+
+class BatchQueryItem(BaseModel):
+    status_code: int = Field(
+        ..., description="HTTP status the single /rag/query call would have returned."
+    )
+    result: QueryResponse | None = None
+    detail: str | None = None
+
+
+class BatchQueryResponse(BaseModel):
+    items: list[BatchQueryItem]
+
+
 class StatusResponse(BaseModel):
     docs_dir: str
     json_files: int
@@ -216,31 +266,161 @@ class ReindexResponse(BaseModel):
     files: int
 
 
+class BotConfigUpdate(BaseModel):
+    """Fields to override; omitted or null fields are re-read from the environment."""
+
+    name: str | None = Field(default=None, min_length=1)
+    hashtags: str | None = None
+    place: str | None = None
+
+
+class BotConfigResponse(BaseModel):
+    name: str
+    hashtags: str
+    place: str | None = None
+
+
 # -------------------------------------------------------------------
 # Ollama chat wrapper
 # -------------------------------------------------------------------
 
 
-def _get_ollama_chat_model() -> str:
-    return os.getenv("OLLAMA_CHAT_MODEL", "llama3.1")
+@dataclass(frozen=True)
+class BotCfg:
+    """Tweet-bot persona; lives on app.state.bot_cfg and can be swapped at runtime."""
 
+    name: str
+    hashtags: str
+    place: str | None
 
-def _get_ollama_base_url() -> str:
-    return os.getenv("OLLAMA_BASE_URL", "http://ollama:11434").rstrip("/")
 
-def _get_ollama_chat_timeout() -> int:
+def load_bot_cfg() -> BotCfg:
+    return BotCfg(
+        name=os.getenv("WEATHER_BOT_NAME", "YokoWeather"),
+        # Space-separated or comma-separated accepted; we pass through to the model.
+        hashtags=os.getenv("HASHTAGS", "#Yokosuka #MiuraPeninsula #Kanagawa"),
+        place=os.getenv("PLACE") or None,
+    )
+
+
+@dataclass(frozen=True)
+class _Cfg:
+    """Per-process settings read once from the environment (see reload_config)."""
+
+    ollama_model: str
+    ollama_base_url: str
+    ollama_timeout: int
+    bot: BotCfg
+    tweet_context_pool: int
+    dist_mult: float
+    semcache_size: int
+    semcache_tau: float
+    semcache_ttl: float
+
+
+def _parse_chat_timeout(raw: str) -> int:
     """
     Seconds for requests timeout to Ollama /api/chat.
     """
-    raw = os.getenv("OLLAMA_CHAT_TIMEOUT", "300")
     try:
         v = int(raw)
         return v if v > 0 else 300
     except Exception:
         return 300
 
-def _call_ollama_chat(*, question: str, system_prompt: str, user_prompt: str) -> str:
-    """Call Ollama's /api/chat endpoint."""
+
+def _parse_int(raw: str, default: int) -> int:
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+def _parse_float(raw: str, default: float) -> float:
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+def _build_cfg() -> _Cfg:
+    return _Cfg(
+        ollama_model=os.getenv("OLLAMA_CHAT_MODEL", "llama3.1"),
+        ollama_base_url=os.getenv("OLLAMA_BASE_URL", "http://ollama:11434").rstrip("/"),
+        ollama_timeout=_parse_chat_timeout(os.getenv("OLLAMA_CHAT_TIMEOUT", "300")),
+        bot=load_bot_cfg(),
+        tweet_context_pool=_parse_int(os.getenv("RAG_TWEET_CONTEXT_POOL", "18"), 18),
+        dist_mult=_parse_float(os.getenv("RAG_DIST_MULT", "1.5"), 1.5),
+        semcache_size=max(0, _parse_int(os.getenv("RAG_SEMCACHE_SIZE", "512"), 512)),
+        semcache_tau=_parse_float(os.getenv("RAG_SEMCACHE_TAU", "0.12"), 0.12),
+        semcache_ttl=max(0.0, _parse_float(os.getenv("RAG_SEMCACHE_TTL", "3600"), 3600.0)),
+    )
+
+
+_CFG = _build_cfg()
+
+
+def reload_config() -> None:
+    """Re-read the hot-path env settings (e.g. after changing the environment in tests).
+
+    The persona in `_CFG.bot` is only the fallback: a running app serves
+    `app.state.bot_cfg`, which is replaced via POST /rag/bot_config.
+    """
+    global _CFG  # noqa: PLW0603
+    _CFG = _build_cfg()
+
+
+def _get_ollama_chat_model() -> str:
+    return _CFG.ollama_model
+
+
+def _get_ollama_base_url() -> str:
+    return _CFG.ollama_base_url
+
+
+def _get_ollama_chat_timeout() -> int:
+    return _CFG.ollama_timeout
+
+def _get_aclient() -> httpx.AsyncClient:
+    """Return the module-level async HTTP client for Ollama (created on first use)."""
+    global _aclient  # noqa: PLW0603
+    if _aclient is not None and not _aclient.is_closed:
+        return _aclient
+    client = httpx.AsyncClient(
+        timeout=httpx.Timeout(_get_ollama_chat_timeout()),
+        # Retries connection failures only (e.g. Ollama restarting); POSTs are not replayed on 5xx.
+        transport=httpx.AsyncHTTPTransport(
+            retries=2,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        ),
+    )
+    _aclient = client
+    return client
+
+
+async def aclose_ollama_client() -> None:
+    """Close the async Ollama client (called on app shutdown)."""
+    global _aclient  # noqa: PLW0603
+    client = _aclient
+    _aclient = None
+    if client is not None:
+        await client.aclose()
+
+
+async def _call_ollama_chat(
+    *,
+    question: str,
+    system_prompt: str,
+    user_prompt: str,
+    max_chars: int | None = None,
+) -> str:
+    """
+    Call Ollama's /api/chat endpoint in streaming mode.
+
+    Content deltas are collected as they arrive. With `max_chars`, generation is
+    cut off once the text is well past the budget (2x), since the answer gets
+    truncated to `max_chars` afterwards anyway.
+    """
     base_url = _get_ollama_base_url()
     model = _get_ollama_chat_model()
 
@@ -250,24 +430,56 @@ def _call_ollama_chat(*, question: str, system_prompt: str, user_prompt: str) ->
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ],
-        "stream": False,
+        "stream": True,
     }
+    limit = max_chars * 2 if max_chars and max_chars > 0 else None
 
+    parts: list[str] = []
     try:
         timeout_s = _get_ollama_chat_timeout()
-        resp = _session.post(f"{base_url}/api/chat", json=payload, timeout=timeout_s)
-        resp.raise_for_status()
-        data = resp.json()
-
-        message = data.get("message") or {}
-        content = message.get("content")
-        if not isinstance(content, str):
+        async with _get_aclient().stream(
+            "POST", f"{base_url}/api/chat", json=payload, timeout=timeout_s
+        ) as resp:
+            resp.raise_for_status()
+            received = 0
+            got_message = False
+            async for line in resp.aiter_lines():
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(str(data["error"]))
+                message = data.get("message") or {}
+                content = message.get("content")
+                if isinstance(content, str):
+                    got_message = True
+                    parts.append(content)
+                    received += len(content)
+                if data.get("done"):
+                    break
+                if limit is not None and received > limit:
+                    # Leaving the stream context closes the connection, which stops generation.
+                    break
+        if not got_message:
             raise RuntimeError("Ollama chat response missing 'message.content'")
     except Exception as e:
         logger.exception("Ollama chat failed: %s", e)
         raise RuntimeError(f"Ollama chat failed: {e}") from e
 
-    return content
+    return "".join(parts)
+
+
+def _get_ollama_num_parallel() -> int:
+    """
+    Max concurrent LLM requests per /rag/query_batch call.
+    Keep in line with the Ollama server's OLLAMA_NUM_PARALLEL.
+    """
+    raw = os.getenv("OLLAMA_NUM_PARALLEL", "4")
+    try:
+        v = int(raw)
+        return v if v > 0 else 4
+    except Exception:
+        return 4
 
 
 def _truthy_env(name: str, default: str = "false") -> bool:
@@ -287,7 +499,7 @@ def _get_ollama_audit_model() -> str:
     return os.getenv("RAG_AUDIT_MODEL") or _get_ollama_chat_model()
 
 
-def _call_ollama_chat_with_model(*, model: str, system_prompt: str, user_prompt: str) -> str:
+async def _call_ollama_chat_with_model(*, model: str, system_prompt: str, user_prompt: str) -> str:
     """Call Ollama's /api/chat endpoint with an explicit model override."""
     base_url = _get_ollama_base_url()
 
@@ -302,7 +514,7 @@ def _call_ollama_chat_with_model(*, model: str, system_prompt: str, user_prompt:
 
     try:
         timeout_s = _get_ollama_chat_timeout()
-        resp = _session.post(f"{base_url}/api/chat", json=payload, timeout=timeout_s)
+        resp = await _get_aclient().post(f"{base_url}/api/chat", json=payload, timeout=timeout_s)
         resp.raise_for_status()
         data = resp.json()
         message = data.get("message")
@@ -403,7 +615,7 @@ def _build_audit_prompts(
     return system_prompt, user_prompt
 
 
-def _run_answer_audit(
+async def _run_answer_audit(
     *,
     question: str,
     answer: str,
@@ -425,7 +637,7 @@ def _run_answer_audit(
         max_chars=max_chars,
     )
 
-    raw = _call_ollama_chat_with_model(
+    raw = await _call_ollama_chat_with_model(
         model=audit_model,
         system_prompt=system_prompt,
         user_prompt=user_prompt,
@@ -493,41 +705,47 @@ def _chunk_id_from_metadata(meta: dict) -> str | None:
 # -------------------------------------------------------------------
 
 
-def _get_bot_name() -> str:
-    return os.getenv("WEATHER_BOT_NAME", "YokoWeather")
+def _get_bot_cfg(http_request: Request) -> BotCfg:
+    """Bot config resolved at startup (app.state), falling back to the import-time env."""
+    cfg = getattr(http_request.app.state, "bot_cfg", None)
+    return cfg if isinstance(cfg, BotCfg) else _CFG.bot
 
 
-def _get_bot_hashtags() -> str:
-    # Space-separated or comma-separated accepted; we pass through to the model.
-    return os.getenv("HASHTAGS", "#Yokosuka #MiuraPeninsula #Kanagawa")
+_WS_RE = re.compile(r"\s+")
 
 
 def _clean_single_line(text: str) -> str:
-    return " ".join(text.replace("\n", " ").replace("\r", " ").replace("\t", " ").split()).strip()
+    return _WS_RE.sub(" ", text).strip()
+
+
+# Opening quote -> matching closing quote.
+_QUOTE_MATCH = {'"': '"', "'": "'", "“": "”", "‘": "’", "`": "`"}
 
 
 def _strip_wrapping_quotes(text: str) -> str:
     s = text.strip()
-    pairs = [
-        ('"', '"'),
-        ("'", "'"),
-        ("“", "”"),
-        ("‘", "’"),
-        ("`", "`"),
-    ]
-    for a, b in pairs:
-        if s.startswith(a) and s.endswith(b) and len(s) >= 2:
-            s = s[1:-1].strip()
+    # One pair only: a quoted quote inside the tweet is kept.
+    if len(s) >= 2 and _QUOTE_MATCH.get(s[0]) == s[-1]:
+        s = s[1:-1].strip()
     return s
 
 
-def _enforce_max_chars(text: str, max_words: int) -> str:
-    if max_words <= 0 or len(text) <= max_words:
-        return text
-    cut = text[: max_words - 1]
-    if " " in cut:
-        cut = cut.rsplit(" ", 1)[0]
-    return cut.rstrip() + "…"
+def _finalize_llm_text(text: str, max_chars: int) -> str:
+    """Strip outer whitespace and enforce `max_chars` (word-boundary cut + "…") in one slice."""
+    start, end = 0, len(text)
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if max_chars <= 0 or end - start <= max_chars:
+        return text[start:end]
+    cut = start + max_chars - 1
+    idx = text.rfind(" ", start, cut)
+    if idx >= 0:
+        cut = idx
+    while cut > start and text[cut - 1].isspace():
+        cut -= 1
+    return text[start:cut] + "…"
 
 
 # -------------------------------------------------------------------
@@ -664,6 +882,32 @@ def _augment_prompts_with_url_policy(
     usr2 = (user_prompt or "") + urls_block
     return sys2, usr2
 
+
+_TWEET_SYSTEM_TEMPLATE = (
+    "You are {bot_name}, a friendly English local story bot for {place} "
+    "(locals, familes and tourists). "
+    "Write one tweet in English within {max_chars} characters. "
+    "No markdown, no lists, no extra commentary, no quotes.\n"
+    "Show only real existing URLs.\n"
+    "TIME AWARENESS:\n"
+    "- Treat NOW (in user prompt) as the current local datetime.\n"
+    "- Do NOT recommend events that are already in the past relative to NOW.\n"
+    "- If you use words like 'today', 'tomorrow', or 'this weekend', they must match NOW.\n"
+    "STYLE:\n"
+    "- Warm, upbeat, practical.\n"
+    "- Use emojis.\n"
+    "- If you add hashtags, pick 1-3 from: {hashtags}.\n"
+)
+
+
+@lru_cache(maxsize=64)
+def _build_system_prompt(bot_name: str, hashtags: str, place: str, max_chars: int) -> str:
+    """Tweet-bot system prompt; identical for every request with the same settings."""
+    return _TWEET_SYSTEM_TEMPLATE.format_map(
+        {"bot_name": bot_name, "hashtags": hashtags, "place": place, "max_chars": max_chars}
+    )
+
+
 def _build_chat_prompts(
     *,
     question: str,
@@ -672,6 +916,7 @@ def _build_chat_prompts(
     output_style: str,
     max_words: int,
     place_hint: str | None,
+    bot_cfg: BotCfg | None = None,
 ) -> tuple[str, str]:
     if output_style != "tweet_bot":
         system = "You answer using the given context."
@@ -683,41 +928,54 @@ def _build_chat_prompts(
         )
         return system, user
 
-    bot_name = _get_bot_name()
-    hashtags = _get_bot_hashtags()
-    place = place_hint or os.getenv("PLACE") or "your area"
+    bot = bot_cfg or _CFG.bot
+    place = place_hint or bot.place or "your area"
 
-    now_block = _format_now_block(live_weather)
+    system = _build_system_prompt(bot.name, bot.hashtags, place, max_words)
+    user = _build_user_prompt(question=question, rag_context=rag_context, live_weather=live_weather)
+    return system, user
 
-    system = (
-        f"You are {bot_name}, a friendly English local story bot for {place} (locals, familes and tourists). "
-        f"Write one tweet in English within {max_words} characters. "
-        "No markdown, no lists, no extra commentary, no quotes.\n"
-        "Show only real existing URLs.\n"
-        "TIME AWARENESS:\n"
-        "- Treat NOW (in user prompt) as the current local datetime.\n"
-        "- Do NOT recommend events that are already in the past relative to NOW.\n"
-        "- If you use words like 'today', 'tomorrow', or 'this weekend', they must match NOW.\n"
-        "STYLE:\n"
-        "- Warm, upbeat, practical.\n"
-        "- Use emojis.\n"
-        f"- If you add hashtags, pick 1-3 from: {hashtags}.\n"
-    )
 
-    def _sample_context(ctx: list[str], seed_text: str, k: int = 8, pool: int = 18) -> list[str]:
-        if not ctx:
-            return []
-        cand = ctx[: min(len(ctx), pool)]
-        seed = int(hashlib.sha256(seed_text.encode("utf-8")).hexdigest()[:8], 16)
-        rng = random.Random(seed)
-        rng.shuffle(cand)
-        return cand[: min(k, len(cand))]
+def _get_dist_mult() -> float:
+    """tweet_bot: drop chunks farther than nearest_distance * RAG_DIST_MULT (<= 0 disables)."""
+    return _CFG.dist_mult
+
 
+def _get_tweet_context_pool() -> int:
+    return _CFG.tweet_context_pool
+
+
+def _prefilter_by_distance(chunks: list[RAGChunk]) -> list[RAGChunk]:
+    """Cut the noisy tail before dedup; `chunks` are nearest-first."""
+    mult = _get_dist_mult()
+    if not chunks or mult <= 0:
+        return chunks
+    nearest = chunks[0].distance
+    if nearest is None or nearest <= 0:
+        # A zero/negative distance gives no usable ratio.
+        return chunks
+    cutoff = nearest * mult
+    return [c for c in chunks if c.distance is not None and c.distance <= cutoff]
+
+
+def _sample_context(ctx: list[str], seed_text: str, k: int = 8, pool: int = 18) -> list[str]:
+    if not ctx:
+        return []
+    cand = ctx[: min(len(ctx), pool)]
+    seed = int(hashlib.sha256(seed_text.encode("utf-8")).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    rng.shuffle(cand)
+    return cand[: min(k, len(cand))]
+
+
+def _build_user_prompt(*, question: str, rag_context: list[str], live_weather: str | None) -> str:
+    """Tweet-bot user prompt: the per-request part (time, weather, sampled context, task)."""
+    now_block = _format_now_block(live_weather)
     sampled = _sample_context(rag_context, question, k=8, pool=18)
-    rag_lines = "\n".join(f"- {c}" for c in sampled) if sampled else "- (none)"
+    rag_lines = "\n".join(["- " + c for c in sampled]) if sampled else "- (none)"
     live_block = live_weather.strip() if isinstance(live_weather, str) and live_weather.strip() else "(not available)"
 
-    user = (
+    return (
         "NOW (for time reasoning):\n"
         f"{now_block}\n"
         "LIVE WEATHER:\n"
@@ -729,7 +987,119 @@ def _build_chat_prompts(
         "Remember: output ONLY the tweet text."
     )
 
-    return system, user
+
+# -------------------------------------------------------------------
+# Semantic cache (tweet_bot): reuse answers for near-duplicate questions
+# -------------------------------------------------------------------
+
+# key: scope digest + L2-normalized float32 query embedding bytes
+# value: (retrieved chunks, raw LLM text, created_at)
+_semantic_cache: OrderedDict[bytes, tuple[list[RAGChunk], str, float]] = OrderedDict()
+# Lazily rebuilt on insert/evict: (keys, contiguous float32 matrix, scope digests, created_at)
+_semcache_index: tuple[list[bytes], np.ndarray, np.ndarray, np.ndarray] | None = None
+_semcache_lock = threading.Lock()
+
+_SEMCACHE_SCOPE_BYTES = 16
+
+
+def _get_semcache_size() -> int:
+    return _CFG.semcache_size
+
+
+def _get_semcache_tau() -> float:
+    """Max cosine distance for a cache hit."""
+    return _CFG.semcache_tau
+
+
+def _get_semcache_ttl() -> float:
+    """Seconds a cached answer stays valid (0 = no expiry)."""
+    return _CFG.semcache_ttl
+
+
+def _semcache_scope(*parts: Any) -> bytes:
+    """Digest of the non-question inputs that also shape the answer."""
+    raw = json.dumps(parts, ensure_ascii=False, default=str, sort_keys=True)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=_SEMCACHE_SCOPE_BYTES).digest()
+
+
+def _embed_question_for_cache(question: str) -> tuple[np.ndarray, np.ndarray] | None:
+    """Return (raw, normalized) query embeddings, or None if embedding is unavailable."""
+    try:
+        raw = rag_store.embed_query(question)
+    except Exception as exc:
+        logger.debug("Semantic cache skipped (embedding failed): %s", exc)
+        return None
+    norm = float(np.linalg.norm(raw))
+    if not norm:
+        return None
+    return raw, np.ascontiguousarray(raw / norm, dtype=np.float32)
+
+
+def _get_semcache_index() -> tuple[list[bytes], np.ndarray, np.ndarray, np.ndarray]:
+    # Caller holds _semcache_lock.
+    global _semcache_index  # noqa: PLW0603
+    if _semcache_index is not None:
+        return _semcache_index
+    keys = list(_semantic_cache)
+    mat = np.ascontiguousarray(
+        np.stack([np.frombuffer(k, dtype=np.float32, offset=_SEMCACHE_SCOPE_BYTES) for k in keys]),
+        dtype=np.float32,
+    )
+    scopes = np.array([k[:_SEMCACHE_SCOPE_BYTES] for k in keys], dtype=f"S{_SEMCACHE_SCOPE_BYTES}")
+    created = np.array([_semantic_cache[k][2] for k in keys], dtype=np.float64)
+    index = (keys, mat, scopes, created)
+    _semcache_index = index
+    return index
+
+
+def _semcache_lookup(q_vec: np.ndarray, scope: bytes) -> tuple[list[RAGChunk], str] | None:
+    global _semcache_index  # noqa: PLW0603
+    tau = _get_semcache_tau()
+    ttl = _get_semcache_ttl()
+    with _semcache_lock:
+        if not _semantic_cache:
+            return None
+        keys, mat, scopes, created = _get_semcache_index()
+        if ttl:
+            # Drop expired entries first so a stale nearer neighbour cannot shadow a fresh one.
+            expired = np.flatnonzero(time.time() - created > ttl)
+            if expired.size:
+                for i in expired:
+                    del _semantic_cache[keys[i]]
+                _semcache_index = None
+                if not _semantic_cache:
+                    return None
+                keys, mat, scopes, created = _get_semcache_index()
+        if mat.shape[1] != q_vec.shape[0]:
+            return None
+        dists = 1.0 - mat @ q_vec
+        dists[scopes != scope] = np.inf
+        i = int(np.argmin(dists))
+        if dists[i] > tau:
+            return None
+        key = keys[i]
+        chunks, llm_text, _created_at = _semantic_cache[key]
+        _semantic_cache.move_to_end(key)
+        return chunks, llm_text
+
+
+def _semcache_insert(
+    q_vec: np.ndarray, scope: bytes, chunks: list[RAGChunk], llm_text: str
+) -> None:
+    global _semcache_index  # noqa: PLW0603
+    capacity = _get_semcache_size()
+    if capacity <= 0:
+        return
+    key = scope + q_vec.tobytes()
+    with _semcache_lock:
+        # Embedding dimension changed (model swap): old keys are not comparable.
+        if _semantic_cache and len(next(iter(_semantic_cache))) != len(key):
+            _semantic_cache.clear()
+        _semantic_cache[key] = (list(chunks), llm_text, time.time())
+        _semantic_cache.move_to_end(key)
+        while len(_semantic_cache) > capacity:
+            _semantic_cache.popitem(last=False)
+        _semcache_index = None
 
 
 # -------------------------------------------------------------------
@@ -752,7 +1122,7 @@ def status() -> StatusResponse:
 
 
 @router.post("/ingest", response_model=IngestResponse)
-def ingest_rag(request: IngestRequest) -> IngestResponse:
+async def ingest_rag(request: IngestRequest) -> IngestResponse:
     """(Optional) Ingest raw texts (kept for backwards-compat / testing).
 
     In production, prefer indexing from JSON files via /rag/reindex or startup auto-index.
@@ -770,7 +1140,7 @@ def ingest_rag(request: IngestRequest) -> IngestResponse:
 
     for text in docs:
         try:
-            rag_store.add_document(text)
+            await run_in_threadpool(rag_store.add_document, text)
             successes += 1
         except Exception as exc:
             logger.exception("Failed to ingest document", exc_info=exc)
@@ -807,6 +1177,31 @@ def reindex() -> ReindexResponse:
         ) from exc
 
 
+@router.post("/bot_config", response_model=BotConfigResponse)
+def reload_bot_config(
+    http_request: Request, update: BotConfigUpdate | None = None
+) -> BotConfigResponse:
+    """Hot-reload the tweet-bot persona (name/hashtags/place) without restarting the app.
+
+    Off unless RAG_BOT_CONFIG_RELOAD_ENABLED is set: the values go straight into
+    the system prompt of every later tweet.
+    """
+    enabled = _truthy(os.getenv("RAG_BOT_CONFIG_RELOAD_ENABLED", "false"))
+    if not enabled:
+        raise HTTPException(
+            status_code=HTTPStatus.FORBIDDEN,
+            detail="Bot config reload is disabled by configuration.",
+        )
+
+    cfg = load_bot_cfg()
+    if update is not None:
+        cfg = replace(cfg, **update.model_dump(exclude_unset=True, exclude_none=True))
+    # Validate the response before swapping: a bad config must not reach the prompts.
+    resp = BotConfigResponse(name=cfg.name, hashtags=cfg.hashtags, place=cfg.place)
+    http_request.app.state.bot_cfg = cfg
+    return resp
+
+
 def _enrich_context_text_with_links(text: str, meta: dict[str, Any]) -> tuple[str, set[str]]:
     """Attach doc-level metadata (especially links) to every chunk's context.
 
@@ -879,30 +1274,97 @@ def _enrich_context_text_with_links(text: str, meta: dict[str, Any]) -> tuple[st
 
 
 @router.post("/query", response_model=QueryResponse, response_model_exclude_none=True)
-def query_rag(payload: QueryRequest, http_request: Request) -> QueryResponse:
+async def query_rag(payload: QueryRequest, http_request: Request) -> QueryResponse:
     """Run a full RAG cycle: retrieve similar chunks and ask the chat model."""
+    return await _answer_query(payload, http_request)
+
+
+@router.post("/query_batch", response_model=BatchQueryResponse, response_model_exclude_none=True)
+async def query_rag_batch(payload: BatchQueryRequest, http_request: Request) -> BatchQueryResponse:
+    """Run several /rag/query cycles concurrently.
+
+    Each item is answered independently; a failing item is reported with its
+    status code and detail instead of failing the whole batch.
+    """
+    sem = asyncio.Semaphore(_get_ollama_num_parallel())
+
+    async def _one(item: QueryRequest) -> QueryResponse:
+        async with sem:
+            return await _answer_query(item, http_request)
+
+    results = await asyncio.gather(*map(_one, payload.items), return_exceptions=True)
+
+    items: list[BatchQueryItem] = []
+    for res in results:
+        if isinstance(res, HTTPException):
+            items.append(BatchQueryItem(status_code=res.status_code, detail=str(res.detail)))
+        elif isinstance(res, Exception):
+            logger.exception("Batch query item failed", exc_info=res)
+            items.append(
+                BatchQueryItem(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(res))
+            )
+        elif isinstance(res, BaseException):
+            raise res
+        else:
+            items.append(BatchQueryItem(status_code=HTTPStatus.OK, result=res))
+
+    return BatchQueryResponse(items=items)
+
+
+async def _answer_query(payload: QueryRequest, http_request: Request) -> QueryResponse:
+    # Compat: accept `context` / `user_context` as aliases for `extra_context`
+    extra_ctx: str | None = payload.extra_context or payload.context or payload.user_context
+
+    # Semantic cache: a near-duplicate tweet_bot question under the same
+    # request context reuses the earlier retrieval + LLM output.
+    q_embed: tuple[np.ndarray, np.ndarray] | None = None
+    cache_scope = b""
+    cached: tuple[list[RAGChunk], str] | None = None
+    bot_cfg = _get_bot_cfg(http_request)
+    if payload.output_style == "tweet_bot" and _get_semcache_size() > 0:
+        cache_scope = _semcache_scope(
+            extra_ctx,
+            payload.max_words,
+            payload.links,
+            sorted(http_request.query_params.multi_items()),
+            bot_cfg,
+            _get_ollama_chat_model(),
+        )
+        q_embed = await run_in_threadpool(_embed_question_for_cache, payload.question)
+        if q_embed is not None:
+            cached = _semcache_lookup(q_embed[1], cache_scope)
+
     try:
-        tweet_pool = int(os.getenv("RAG_TWEET_CONTEXT_POOL", "18"))
+        tweet_pool = _get_tweet_context_pool()
         raw_k = max(payload.top_k * 4, tweet_pool * 4) if payload.output_style == "tweet_bot" else payload.top_k
 
-        chunks: list[RAGChunk] = rag_store.query_similar_chunks(
-            payload.question,
-            top_k=raw_k,
-        )
+        if cached is not None:
+            chunks: list[RAGChunk] = list(cached[0])
+        elif q_embed is not None:
+            chunks = await run_in_threadpool(
+                rag_store.query_similar_chunks,
+                payload.question,
+                top_k=raw_k,
+                query_embedding=q_embed[0],
+            )
+        else:
+            chunks = await run_in_threadpool(
+                rag_store.query_similar_chunks,
+                payload.question,
+                top_k=raw_k,
+            )
 
-        if payload.output_style == "tweet_bot":
-            seen = set()
-            diversified = []
-            for c in sorted(chunks, key=lambda x: x.distance):
+        if payload.output_style == "tweet_bot" and cached is None:
+            chunks = _prefilter_by_distance(chunks)
+            # Ordered set keyed by source: keeps the nearest chunk per file/doc.
+            # query_similar_chunks returns hits nearest-first, so no re-sort is needed.
+            seen: dict[str, RAGChunk] = {}
+            for c in chunks:
                 meta = c.metadata if isinstance(c.metadata, dict) else {}
                 key = meta.get("file") or meta.get("doc_id") or c.text[:40]
-                if key in seen:
-                    continue
-                diversified.append(c)
-                seen.add(key)
-                if len(diversified) >= tweet_pool:
+                if seen.setdefault(key, c) is c and len(seen) >= tweet_pool:
                     break
-            chunks = diversified or chunks[:tweet_pool]
+            chunks = list(seen.values()) or chunks[:tweet_pool]
     except Exception as exc:
         logger.exception("Vector search failed", exc_info=exc)
         raise HTTPException(
@@ -924,9 +1386,6 @@ def query_rag(payload: QueryRequest, http_request: Request) -> QueryResponse:
         context_texts.append(enriched)
         doc_links |= links
 
-    # Compat: accept `context` / `user_context` as aliases for `extra_context`
-    extra_ctx: str | None = payload.extra_context or payload.context or payload.user_context
-
     def _looks_like_weather_json(s: str) -> bool:
         try:
             obj = json.loads(s)
@@ -951,7 +1410,8 @@ def query_rag(payload: QueryRequest, http_request: Request) -> QueryResponse:
 
     if (live_extra is None or not live_extra.strip()):
         try:
-            live_extra = get_live_weather_context(
+            live_extra = await run_in_threadpool(
+                get_live_weather_context,
                 http_request=http_request,
                 session=_session,
             )
@@ -962,8 +1422,7 @@ def query_rag(payload: QueryRequest, http_request: Request) -> QueryResponse:
                 detail=f"Live weather fetch failed: {exc}",
             ) from exc
 
-
-    place_hint = http_request.query_params.get("place") or os.getenv("PLACE")
+    place_hint = http_request.query_params.get("place") or bot_cfg.place
 
     # If caller provided non-weather extra context, keep it, but don't poison LIVE WEATHER.
     if user_extra:
@@ -983,33 +1442,41 @@ def query_rag(payload: QueryRequest, http_request: Request) -> QueryResponse:
     allowed_urls = _collect_allowed_urls(context_texts, live_extra) | set(req_links)
 
 
-    system_prompt, user_prompt = _build_chat_prompts(
-        question=payload.question,
-        rag_context=context_texts,
-        live_weather=live_extra,
-        output_style=payload.output_style,
-        max_words=payload.max_words,
-        place_hint=place_hint,
-    )
-
-    system_prompt, user_prompt = _augment_prompts_with_url_policy(
-        system_prompt,
-        user_prompt,
-        allowed_urls=allowed_urls,
-    )
-
-    try:
-        answer = _call_ollama_chat(
+    if cached is not None:
+        answer = cached[1]
+    else:
+        system_prompt, user_prompt = _build_chat_prompts(
             question=payload.question,
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
+            rag_context=context_texts,
+            live_weather=live_extra,
+            output_style=payload.output_style,
+            max_words=payload.max_words,
+            place_hint=place_hint,
+            bot_cfg=bot_cfg,
         )
-    except Exception as exc:
-        logger.exception("Ollama chat failed", exc_info=exc)
-        raise HTTPException(
-            status_code=HTTPStatus.BAD_GATEWAY,
-            detail=str(exc),
-        ) from exc
+
+        system_prompt, user_prompt = _augment_prompts_with_url_policy(
+            system_prompt,
+            user_prompt,
+            allowed_urls=allowed_urls,
+        )
+
+        try:
+            answer = await _call_ollama_chat(
+                question=payload.question,
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                max_chars=payload.max_words,
+            )
+        except Exception as exc:
+            logger.exception("Ollama chat failed", exc_info=exc)
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_GATEWAY,
+                detail=str(exc),
+            ) from exc
+
+        if q_embed is not None:
+            _semcache_insert(q_embed[1], cache_scope, chunks, answer)
 
     answer = _strip_wrapping_quotes(_clean_single_line(answer))
     answer, removed_urls = _filter_answer_urls(
@@ -1017,7 +1484,7 @@ def query_rag(payload: QueryRequest, http_request: Request) -> QueryResponse:
         allowed_urls=allowed_urls,
         allowlist_regexes=_get_allowlist_regexes(),
     )
-    answer = _enforce_max_chars(answer, payload.max_words)
+    answer = _finalize_llm_text(answer, payload.max_words)
 
     # Optional: audit the answer with a second LLM call.
     audit_enabled = payload.audit if payload.audit is not None else _get_audit_default_enabled()
@@ -1038,7 +1505,7 @@ def query_rag(payload: QueryRequest, http_request: Request) -> QueryResponse:
             if req_links:
                 audit_question = "REQUEST_LINKS:\n" + "\n".join(f"- {u}" for u in req_links[:10])
 
-            audit_result = _run_answer_audit(
+            audit_result = await _run_answer_audit(
                 question=payload.question,
                 answer=answer,
                 rag_context=audit_context,
@@ -1071,7 +1538,7 @@ def query_rag(payload: QueryRequest, http_request: Request) -> QueryResponse:
             )
             if removed_urls_2:
                 removed_urls = (removed_urls or []) + removed_urls_2
-            answer = _enforce_max_chars(answer, payload.max_words)
+            answer = _finalize_llm_text(answer, payload.max_words)
 
     debug_context: list[str] | None = None
     debug_chunks: list[ChunkOut] | None = None
@@ -1,7 +1,9 @@
+from collections import OrderedDict
 from collections.abc import Iterator
 from http import HTTPStatus
 
 import pytest
+import routers.rag as rag_router
 from database import engine
 from fastapi.testclient import TestClient
 from main import app
@@ -24,6 +26,15 @@ def _clean_db() -> Iterator[None]:
     yield
 
 
+@pytest.fixture(autouse=True)
+def _no_semantic_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Fresh, disabled semantic cache: no embed_query call unless a test opts in."""
+    monkeypatch.setattr(rag_router, "_semantic_cache", OrderedDict())
+    monkeypatch.setattr(rag_router, "_semcache_index", None)
+    monkeypatch.setenv("RAG_SEMCACHE_SIZE", "0")
+    monkeypatch.setattr(rag_router, "_CFG", rag_router._build_cfg())
+
+
 @pytest.fixture()
 def client() -> Iterator[TestClient]:
     with TestClient(app) as c:
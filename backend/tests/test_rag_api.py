@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+from collections import OrderedDict
 from http import HTTPStatus
 
+import numpy as np
 import pytest
 import rag_store
 import routers.rag as rag_router
@@ -21,7 +23,9 @@ def test_rag_query_strips_incomplete_scheme(client, monkeypatch):
         ],
     )
 
-    def fake_call_ollama_chat(*, question: str, system_prompt: str, user_prompt: str) -> str:
+    async def fake_call_ollama_chat(
+        *, question: str, system_prompt: str, user_prompt: str, max_chars: int | None = None
+    ) -> str:
         return f"Nice spot! (https://) Official: {allowed}"
 
     monkeypatch.setattr(rag_router, "_call_ollama_chat", fake_call_ollama_chat)
@@ -85,7 +89,9 @@ def test_rag_query_success(
 
     monkeypatch.setattr(rag_store, "query_similar_chunks", fake_query_similar_chunks)
 
-    def fake_call_ollama_chat(*, question: str, system_prompt: str, user_prompt: str) -> str:
+    async def fake_call_ollama_chat(
+        *, question: str, system_prompt: str, user_prompt: str, max_chars: int | None = None
+    ) -> str:
         assert "Miura Peninsula" in user_prompt
         return f"ANSWER to: {question}"
 
@@ -113,7 +119,9 @@ def test_rag_query_uses_extra_context(client: TestClient, monkeypatch: pytest.Mo
 
     monkeypatch.setattr(rag_store, "query_similar_chunks", fake_query_similar_chunks)
 
-    def fake_call_ollama_chat(*, question: str, system_prompt: str, user_prompt: str) -> str:
+    async def fake_call_ollama_chat(
+        *, question: str, system_prompt: str, user_prompt: str, max_chars: int | None = None
+    ) -> str:
         assert "Yokosuka is a coastal city" in context
         assert "[Live context]" in context
         assert "Current: 10°C" in context
@@ -160,7 +168,9 @@ def test_rag_query_ollama_failure_returns_502(
 
     monkeypatch.setattr(rag_store, "query_similar_chunks", fake_query_similar_chunks)
 
-    def fake_call_ollama_chat(*, question: str, system_prompt: str, user_prompt: str) -> str:
+    async def fake_call_ollama_chat(
+        *, question: str, system_prompt: str, user_prompt: str, max_chars: int | None = None
+    ) -> str:
         raise RuntimeError("Ollama is down")
 
     monkeypatch.setattr(rag_router, "_call_ollama_chat", fake_call_ollama_chat)
@@ -187,7 +197,9 @@ def test_rag_query_filters_unknown_urls(client, monkeypatch):
         ],
     )
 
-    def fake_call_ollama_chat(*, question: str, system_prompt: str, user_prompt: str) -> str:
+    async def fake_call_ollama_chat(
+        *, question: str, system_prompt: str, user_prompt: str, max_chars: int | None = None
+    ) -> str:
         # Model tries to include a URL that is NOT in the retrieved context
         return f"Use {allowed} and also https://example.com/NOT_ALLOWED"
 
@@ -216,10 +228,14 @@ def test_rag_query_audit_returns_verdict(client, monkeypatch):
 
     monkeypatch.setattr(rag_store, "query_similar_chunks", fake_query_similar_chunks)
 
-    def fake_call_ollama_chat(*, question: str, system_prompt: str, user_prompt: str) -> str:
+    async def fake_call_ollama_chat(
+        *, question: str, system_prompt: str, user_prompt: str, max_chars: int | None = None
+    ) -> str:
         return f"Use {allowed}."
 
-    def fake_call_ollama_chat_with_model(*, model: str, system_prompt: str, user_prompt: str) -> str:
+    async def fake_call_ollama_chat_with_model(
+        *, model: str, system_prompt: str, user_prompt: str
+    ) -> str:
         return (
             '{"passed": true, "score": 95, "confidence": "high", "issues": [], "fixed_answer": null}'
         )
@@ -250,10 +266,14 @@ def test_rag_query_audit_can_rewrite_answer(client, monkeypatch):
 
     monkeypatch.setattr(rag_store, "query_similar_chunks", fake_query_similar_chunks)
 
-    def fake_call_ollama_chat(*, question: str, system_prompt: str, user_prompt: str) -> str:
+    async def fake_call_ollama_chat(
+        *, question: str, system_prompt: str, user_prompt: str, max_chars: int | None = None
+    ) -> str:
         return f"Unsupported claim. Read more: https://example.com/NOT_ALLOWED"
 
-    def fake_call_ollama_chat_with_model(*, model: str, system_prompt: str, user_prompt: str) -> str:
+    async def fake_call_ollama_chat_with_model(
+        *, model: str, system_prompt: str, user_prompt: str
+    ) -> str:
         return (
             '{"passed": false, "score": 10, "confidence": "low", "issues": ["unsupported"], '
             '"fixed_answer": "Use https://example.com/allowed."}'
@@ -272,3 +292,174 @@ def test_rag_query_audit_can_rewrite_answer(client, monkeypatch):
     assert allowed in data["answer"]
     assert "NOT_ALLOWED" not in data["answer"]
     assert "original_answer" in data["audit"]
+
+
+def test_rag_query_semantic_cache_reuses_answer(client, monkeypatch):
+    monkeypatch.setenv("RAG_SEMCACHE_SIZE", "16")
+    monkeypatch.setattr(rag_router, "_CFG", rag_router._build_cfg())
+    monkeypatch.setattr(rag_router, "_semantic_cache", OrderedDict())
+    monkeypatch.setattr(rag_router, "_semcache_index", None)
+
+    vectors = {
+        "Tweet about the coast": np.array([1.0, 0.0, 0.0], dtype=np.float32),
+        "Tweet about the seaside": np.array([0.99, 0.05, 0.0], dtype=np.float32),
+        "Tweet about ramen": np.array([0.0, 1.0, 0.0], dtype=np.float32),
+    }
+    monkeypatch.setattr(rag_store, "embed_query", lambda q: vectors[q])
+
+    retrievals: list[str] = []
+
+    def fake_query_similar_chunks(question: str, top_k: int = 3, **_kwargs):
+        retrievals.append(question)
+        return [RAGChunk(text="Kannonzaki lighthouse", distance=0.1, metadata={"file": "a.json"})]
+
+    monkeypatch.setattr(rag_store, "query_similar_chunks", fake_query_similar_chunks)
+
+    llm_calls: list[str] = []
+
+    async def fake_call_ollama_chat(
+        *, question: str, system_prompt: str, user_prompt: str, max_chars: int | None = None
+    ) -> str:
+        llm_calls.append(question)
+        return f"Answer #{len(llm_calls)}"
+
+    monkeypatch.setattr(rag_router, "_call_ollama_chat", fake_call_ollama_chat)
+
+    weather = '{"timezone": "Asia/Tokyo", "current": {"time": "2025-12-28T21:00"}}'
+
+    def ask(question: str) -> str:
+        r = client.post("/rag/query", json={"question": question, "extra_context": weather})
+        assert r.status_code == HTTPStatus.OK, r.text
+        return r.json()["answer"]
+
+    assert ask("Tweet about the coast") == "Answer #1"
+    assert ask("Tweet about the seaside") == "Answer #1"
+    assert ask("Tweet about ramen") == "Answer #2"
+    assert retrievals == ["Tweet about the coast", "Tweet about ramen"]
+    assert llm_calls == ["Tweet about the coast", "Tweet about ramen"]
+
+
+def test_semcache_expired_neighbour_does_not_shadow_fresh_entry(monkeypatch):
+    monkeypatch.setattr(rag_router, "_semantic_cache", OrderedDict())
+    monkeypatch.setattr(rag_router, "_semcache_index", None)
+    monkeypatch.setenv("RAG_SEMCACHE_SIZE", "16")
+    monkeypatch.setenv("RAG_SEMCACHE_TTL", "60")
+    monkeypatch.setattr(rag_router, "_CFG", rag_router._build_cfg())
+
+    def unit(v: list[float]) -> np.ndarray:
+        a = np.array(v, dtype=np.float32)
+        return a / np.linalg.norm(a)
+
+    scope = rag_router._semcache_scope("tweet_bot")
+    query = unit([1.0, 0.0, 0.0])
+    stale = unit([1.0, 0.04, 0.0])
+    fresh = unit([1.0, 0.2, 0.0])
+
+    rag_router._semcache_insert(stale, scope, [], "stale answer")
+    rag_router._semcache_insert(fresh, scope, [], "fresh answer")
+    stale_key = scope + stale.tobytes()
+    chunks, text, created_at = rag_router._semantic_cache[stale_key]
+    rag_router._semantic_cache[stale_key] = (chunks, text, created_at - 3600)
+    monkeypatch.setattr(rag_router, "_semcache_index", None)
+
+    assert rag_router._semcache_lookup(query, scope) == ([], "fresh answer")
+    assert stale_key not in rag_router._semantic_cache
+
+
+def test_rag_query_batch_reports_each_item(client, monkeypatch):
+    def fake_query_similar_chunks(question: str, top_k: int = 3, **_kwargs):
+        if question == "empty":
+            return []
+        return [RAGChunk(text=f"Context for {question}", distance=0.1, metadata={"source": "test"})]
+
+    monkeypatch.setattr(rag_store, "query_similar_chunks", fake_query_similar_chunks)
+
+    async def fake_call_ollama_chat(
+        *, question: str, system_prompt: str, user_prompt: str, max_chars: int | None = None
+    ) -> str:
+        return f"ANSWER to: {question}"
+
+    monkeypatch.setattr(rag_router, "_call_ollama_chat", fake_call_ollama_chat)
+    monkeypatch.setenv("OLLAMA_NUM_PARALLEL", "2")
+
+    weather = '{"timezone": "Asia/Tokyo", "current": {"time": "2025-12-28T21:00"}}'
+    items = [
+        {"question": q, "output_style": "default", "extra_context": weather}
+        for q in ("coast", "empty", "ramen")
+    ]
+    r = client.post("/rag/query_batch", json={"items": items})
+
+    assert r.status_code == HTTPStatus.OK, r.text
+    out = r.json()["items"]
+    assert [it["status_code"] for it in out] == [200, 404, 200]
+    assert out[0]["result"]["answer"] == "ANSWER to: coast"
+    assert "No relevant context" in out[1]["detail"]
+    assert out[2]["result"]["answer"] == "ANSWER to: ramen"
+
+
+def test_rag_bot_config_reload_is_used_by_tweet_prompts(client, monkeypatch):
+    monkeypatch.setattr(client.app.state, "bot_cfg", client.app.state.bot_cfg)
+    monkeypatch.setenv("HASHTAGS", "#Miura")
+    monkeypatch.setenv("RAG_BOT_CONFIG_RELOAD_ENABLED", "true")
+    monkeypatch.setenv("RAG_SEMCACHE_SIZE", "16")
+    monkeypatch.setattr(rag_router, "_CFG", rag_router._build_cfg())
+    monkeypatch.setattr(rag_router, "_semantic_cache", OrderedDict())
+    monkeypatch.setattr(rag_router, "_semcache_index", None)
+    monkeypatch.setattr(rag_store, "embed_query", lambda q: np.array([1.0, 0.0], dtype=np.float32))
+
+    def fake_query_similar_chunks(question: str, top_k: int = 3, **_kwargs):
+        return [RAGChunk(text="Kannonzaki lighthouse", distance=0.1, metadata={"file": "a.json"})]
+
+    monkeypatch.setattr(rag_store, "query_similar_chunks", fake_query_similar_chunks)
+
+    system_prompts: list[str] = []
+
+    async def fake_call_ollama_chat(
+        *, question: str, system_prompt: str, user_prompt: str, max_chars: int | None = None
+    ) -> str:
+        system_prompts.append(system_prompt)
+        return "Sunny by the lighthouse"
+
+    monkeypatch.setattr(rag_router, "_call_ollama_chat", fake_call_ollama_chat)
+
+    weather = '{"timezone": "Asia/Tokyo", "current": {"time": "2025-12-28T21:00"}}'
+
+    def ask() -> None:
+        r = client.post("/rag/query", json={"question": "Tweet", "extra_context": weather})
+        assert r.status_code == HTTPStatus.OK, r.text
+
+    # Answer once under the startup persona; it lands in the semantic cache.
+    ask()
+
+    r = client.post("/rag/bot_config", json={"name": "MiuraBot", "place": "Misaki"})
+    assert r.status_code == HTTPStatus.OK, r.text
+    assert r.json() == {"name": "MiuraBot", "hashtags": "#Miura", "place": "Misaki"}
+
+    # Same question after the reload must not be served from the old persona's cache entry.
+    ask()
+    _, reloaded_prompt = system_prompts
+    assert "You are MiuraBot" in reloaded_prompt
+    assert "story bot for Misaki" in reloaded_prompt
+    assert "#Miura." in reloaded_prompt
+
+
+def test_rag_bot_config_null_fields_keep_env_values(client, monkeypatch):
+    monkeypatch.setattr(client.app.state, "bot_cfg", client.app.state.bot_cfg)
+    monkeypatch.setenv("WEATHER_BOT_NAME", "YokoWeather")
+    monkeypatch.setenv("HASHTAGS", "#Yokosuka")
+    monkeypatch.setenv("RAG_BOT_CONFIG_RELOAD_ENABLED", "true")
+
+    r = client.post("/rag/bot_config", json={"name": None, "hashtags": None})
+    assert r.status_code == HTTPStatus.OK, r.text
+    assert r.json()["name"] == "YokoWeather"
+    assert r.json()["hashtags"] == "#Yokosuka"
+    assert client.app.state.bot_cfg.name == "YokoWeather"
+
+
+def test_rag_bot_config_reload_is_disabled_by_default(client, monkeypatch):
+    monkeypatch.delenv("RAG_BOT_CONFIG_RELOAD_ENABLED", raising=False)
+    before = client.app.state.bot_cfg
+
+    r = client.post("/rag/bot_config", json={"name": "Injected"})
+    assert r.status_code == HTTPStatus.FORBIDDEN, r.text
+    assert client.app.state.bot_cfg is before
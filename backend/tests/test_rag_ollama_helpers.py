@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import json
 from typing import Any
 
 import pytest
 import routers.rag as rag_router
+from rag_store import RAGChunk
 
 
 def test_get_ollama_chat_model_default(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.delenv("OLLAMA_CHAT_MODEL", raising=False)
+    monkeypatch.setattr(rag_router, "_CFG", rag_router._build_cfg())
 
     value = rag_router._get_ollama_chat_model()
     assert value == "llama3.1"
@@ -15,6 +19,7 @@ def test_get_ollama_chat_model_default(monkeypatch: pytest.MonkeyPatch) -> None:
 
 def test_get_ollama_chat_model_env_override(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setenv("OLLAMA_CHAT_MODEL", "custom-model")
+    monkeypatch.setattr(rag_router, "_CFG", rag_router._build_cfg())
 
     value = rag_router._get_ollama_chat_model()
     assert value == "custom-model"
@@ -22,58 +27,210 @@ def test_get_ollama_chat_model_env_override(monkeypatch: pytest.MonkeyPatch) ->
 
 def test_get_ollama_base_url_default(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.delenv("OLLAMA_BASE_URL", raising=False)
+    monkeypatch.setattr(rag_router, "_CFG", rag_router._build_cfg())
 
     value = rag_router._get_ollama_base_url()
     assert value == "http://ollama:11434"
 
 
+def test_reload_config_picks_up_env_changes(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(rag_router, "_CFG", rag_router._CFG)
+    monkeypatch.setenv("WEATHER_BOT_NAME", "MiuraBot")
+
+    rag_router.reload_config()
+
+    assert rag_router._CFG.bot.name == "MiuraBot"
+
+
 def test_get_ollama_base_url_env_override_trims_slash(
     monkeypatch: pytest.MonkeyPatch,
 ) -> None:
     monkeypatch.setenv("OLLAMA_BASE_URL", "http://example.com:1234/")
+    monkeypatch.setattr(rag_router, "_CFG", rag_router._build_cfg())
 
     value = rag_router._get_ollama_base_url()
     assert value == "http://example.com:1234"
 
 
-def test_call_ollama_chat_uses_session_and_parses_content(
+class DummyStreamResponse:
+    def __init__(self, lines: list[str], consumed: list[str]) -> None:
+        self._lines = lines
+        self._consumed = consumed
+
+    def raise_for_status(self) -> None:
+        return None
+
+    async def aiter_lines(self):
+        for line in self._lines:
+            self._consumed.append(line)
+            yield line
+
+
+class DummyStream:
+    def __init__(self, response: DummyStreamResponse) -> None:
+        self._response = response
+
+    async def __aenter__(self) -> DummyStreamResponse:
+        return self._response
+
+    async def __aexit__(self, *exc: Any) -> None:
+        return None
+
+
+def _stream_lines(*parts: str) -> list[str]:
+    lines = [
+        json.dumps({"message": {"role": "assistant", "content": p}, "done": False}) for p in parts
+    ]
+    lines.append(json.dumps({"message": {"role": "assistant", "content": ""}, "done": True}))
+    return lines
+
+
+def test_call_ollama_chat_uses_async_client_and_parses_content(
     monkeypatch: pytest.MonkeyPatch,
 ) -> None:
     calls: list[dict[str, Any]] = []
+    consumed: list[str] = []
 
-    class DummyResponse:
-        def __init__(self, payload: dict[str, Any]) -> None:
-            self._payload = payload
-
-        def raise_for_status(self) -> None:
-            return None
+    class DummyAsyncClient:
+        is_closed = False
 
-        def json(self) -> dict[str, Any]:
-            return self._payload
-
-    class DummySession:
-        def post(self, url: str, json: dict[str, Any], timeout: int) -> DummyResponse:
-            calls.append({"url": url, "json": json, "timeout": timeout})
-            return DummyResponse({"message": {"content": "dummy answer"}})
+        def stream(self, method: str, url: str, json: dict[str, Any], timeout: int) -> DummyStream:
+            calls.append({"method": method, "url": url, "json": json, "timeout": timeout})
+            return DummyStream(DummyStreamResponse(_stream_lines("dummy ", "answer"), consumed))
 
     monkeypatch.setenv("OLLAMA_BASE_URL", "http://ollama:11434/")
     monkeypatch.setenv("OLLAMA_CHAT_MODEL", "llama3.1")
+    monkeypatch.setattr(rag_router, "_CFG", rag_router._build_cfg())
 
-    monkeypatch.setattr(rag_router, "_session", DummySession())
+    monkeypatch.setattr(rag_router, "_aclient", DummyAsyncClient())
 
-    result = rag_router._call_ollama_chat(
-        question="What is Miura Peninsula?",
-        context="Some context about Miura Peninsula.",
+    result = asyncio.run(
+        rag_router._call_ollama_chat(
+            question="What is Miura Peninsula?",
+            system_prompt="You answer using the given context.",
+            user_prompt="Some context about Miura Peninsula.",
+        )
     )
 
     assert result == "dummy answer"
 
-    assert calls, "DummySession.post should have been called at least once."
+    assert calls, "DummyAsyncClient.stream should have been called at least once."
     call = calls[0]
 
+    assert call["method"] == "POST"
     assert call["url"].endswith("/api/chat")
 
     payload = call["json"]
     assert payload["model"] == "llama3.1"
-    assert payload.get("stream") is False
+    assert payload.get("stream") is True
     assert any(m["role"] == "user" for m in payload.get("messages", []))
+
+
+def test_call_ollama_chat_stops_reading_past_max_chars(monkeypatch: pytest.MonkeyPatch) -> None:
+    consumed: list[str] = []
+    lines = _stream_lines(*(["0123456789"] * 10))
+
+    class DummyAsyncClient:
+        is_closed = False
+
+        def stream(self, method: str, url: str, json: dict[str, Any], timeout: int) -> DummyStream:
+            return DummyStream(DummyStreamResponse(lines, consumed))
+
+    monkeypatch.setattr(rag_router, "_aclient", DummyAsyncClient())
+
+    result = asyncio.run(
+        rag_router._call_ollama_chat(
+            question="q",
+            system_prompt="s",
+            user_prompt="u",
+            max_chars=10,
+        )
+    )
+
+    # 2x budget = 20 chars: the third delta crosses it and reading stops there.
+    assert result == "0123456789" * 3
+    assert consumed == lines[:3]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('"hi"', "hi"),
+        ("  “ hi ”  ", "hi"),
+        ("`hi`", "hi"),
+        # only the outermost pair goes
+        ('""hi""', '"hi"'),
+        ("'\"hi\"'", '"hi"'),
+        # mismatched or lone quotes stay
+        ("“hi\"", "“hi\""),
+        ('"', '"'),
+        ("hi", "hi"),
+    ],
+)
+def test_strip_wrapping_quotes(text: str, expected: str) -> None:
+    assert rag_router._strip_wrapping_quotes(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, max_chars, expected",
+    [
+        # budget <= 0 disables the cut
+        ("  long text here  ", 0, "long text here"),
+        ("  long text here  ", -1, "long text here"),
+        # within budget: only stripped
+        ("hello world", 11, "hello world"),
+        ("\n hello world \t", 11, "hello world"),
+        # cut at the last space before the budget, then "…"
+        ("hello brave new world", 14, "hello brave…"),
+        ("hello   brave new world", 10, "hello…"),
+        # no space before the cut: hard cut at max_chars - 1
+        ("abcdefghijklmnop", 6, "abcde…"),
+        # leading whitespace does not count against the budget
+        ("    abc def ghi", 9, "abc def…"),
+    ],
+)
+def test_finalize_llm_text(text: str, max_chars: int, expected: str) -> None:
+    assert rag_router._finalize_llm_text(text, max_chars) == expected
+
+
+def _chunks(*distances: float | None) -> list[RAGChunk]:
+    return [RAGChunk(text=f"c{i}", distance=d, metadata={}) for i, d in enumerate(distances)]
+
+
+def test_prefilter_by_distance_default_cutoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("RAG_DIST_MULT", raising=False)
+    monkeypatch.setattr(rag_router, "_CFG", rag_router._build_cfg())
+
+    kept = rag_router._prefilter_by_distance(_chunks(0.2, 0.3, 0.31, 0.5))
+
+    # 1.5 x nearest (0.2) = 0.3: the boundary is kept, the tail is dropped
+    assert [c.text for c in kept] == ["c0", "c1"]
+
+
+def test_prefilter_by_distance_non_positive_mult_disables(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("RAG_DIST_MULT", "0")
+    monkeypatch.setattr(rag_router, "_CFG", rag_router._build_cfg())
+    chunks = _chunks(0.2, 0.9)
+
+    assert rag_router._prefilter_by_distance(chunks) is chunks
+
+
+def test_prefilter_by_distance_zero_nearest_keeps_all(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("RAG_DIST_MULT", raising=False)
+    monkeypatch.setattr(rag_router, "_CFG", rag_router._build_cfg())
+    chunks = _chunks(0.0, 0.4, 0.9)
+
+    assert rag_router._prefilter_by_distance(chunks) is chunks
+
+
+def test_prefilter_by_distance_handles_none_distances(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("RAG_DIST_MULT", raising=False)
+    monkeypatch.setattr(rag_router, "_CFG", rag_router._build_cfg())
+
+    # no distance on the nearest hit: nothing to compare against, keep all
+    unranked = _chunks(None, 0.4)
+    assert rag_router._prefilter_by_distance(unranked) is unranked
+
+    # a later hit without a distance cannot be shown to be close: drop it
+    kept = rag_router._prefilter_by_distance(_chunks(0.2, None, 0.25))
+    assert [c.text for c in kept] == ["c0", "c2"]
@@ -18,17 +18,39 @@ Notes:
 
 from __future__ import annotations
 
-import argparse
 import datetime as dt
 import json
 import math
 import os
 import sys
+import tempfile
+import time
 from pathlib import Path
+import urllib.error
 import urllib.parse
 import urllib.request
 from typing import Any, Dict, Optional, Tuple
 
+try:  # optional: faster JSON when orjson is installed
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _loads(data: Any) -> Any:
+    """json.loads for str or bytes (bytes are parsed without decoding first under orjson)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps(obj: Any, indent: bool = False) -> str:
+    """json.dumps(obj, ensure_ascii=False[, indent=2])."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None)
+
+
 # ---- Open-Meteo (existing) ----
 OPEN_METEO_BASE = "https://api.open-meteo.com/v1/forecast"
 
@@ -47,7 +69,93 @@ def http_get_text(url: str, timeout_s: float = 10.0) -> str:
 
 
 def http_get_json(url: str, timeout_s: float = 10.0) -> Any:
-    return json.loads(http_get_text(url, timeout_s=timeout_s))
+    req = urllib.request.Request(url, headers={"User-Agent": "rag-chat-bot/1.0 (+weather)"})
+    with urllib.request.urlopen(req, timeout=timeout_s) as resp:
+        return _loads(resp.read())
+
+
+def _jma_ttl_s() -> float:
+    try:
+        return float(os.getenv("JMA_TTL_S", "600"))
+    except ValueError:
+        return 600.0
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    finally:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+
+
+def http_get_json_cached(url: str, cache_name: str, timeout_s: float = 10.0) -> Any:
+    """GET JSON through an on-disk cache in the temp dir.
+
+    Within JMA_TTL_S seconds the cached body is returned without a request;
+    after that the request is revalidated with ETag / Last-Modified, and a
+    304 reuses the cached body. Cache problems never fail the fetch.
+    """
+    body_path = Path(tempfile.gettempdir()) / f"{cache_name}.json"
+    meta_path = Path(tempfile.gettempdir()) / f"{cache_name}.meta.json"
+
+    # A cached body that does not decode is treated as absent, so the request
+    # below goes out unconditionally instead of trusting a 304 for it.
+    cached: Any = None
+    meta: Dict[str, Any] = {}
+    try:
+        meta = _loads(meta_path.read_bytes())
+        if meta.get("url") == url:
+            cached = _loads(body_path.read_bytes())
+        else:
+            meta = {}
+    except (OSError, ValueError):
+        cached, meta = None, {}
+
+    ttl = _jma_ttl_s()
+    if cached is not None and ttl > 0:
+        try:
+            if time.time() - body_path.stat().st_mtime < ttl:
+                return cached
+        except OSError:
+            pass
+
+    headers = {"User-Agent": "rag-chat-bot/1.0 (+weather)"}
+    if cached is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    req = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout_s) as resp:
+            raw = resp.read()
+            meta = {
+                "url": url,
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+            }
+    except urllib.error.HTTPError as e:
+        if e.code != 304 or cached is None:
+            raise
+        try:
+            body_path.touch()  # revalidated: restart the TTL window
+        except OSError:
+            pass
+        return cached
+
+    data = _loads(raw)
+    try:
+        # Body first, then its meta; each lands whole or not at all.
+        _write_atomic(body_path, raw)
+        _write_atomic(meta_path, _dumps(meta).encode("utf-8"))
+    except OSError:
+        pass
+    return data
 
 
 # -------------------- Open-Meteo --------------------
@@ -275,7 +383,8 @@ def fetch_jma_forecast(
     area_code: Optional[str],
     temp_city_code: Optional[str],
 ) -> Dict[str, Any]:
-    data = http_get_json(f"{JMA_FORECAST_BASE}/{office_code}.json")
+    # JMA republishes forecasts a few times a day; revalidate instead of refetching every run.
+    data = http_get_json_cached(f"{JMA_FORECAST_BASE}/{office_code}.json", f"jma_{office_code}")
     if not isinstance(data, list) or not data:
         raise RuntimeError("Unexpected JMA forecast payload")
 
@@ -469,7 +578,48 @@ def fetch_weather_snapshot(
     raise SystemExit(f"Unknown provider: {provider!r}")
 
 
+def fetch_snapshot(
+    place: str,
+    lat: float,
+    lon: float,
+    tz: str,
+    provider: Optional[str] = None,
+    office_code: Optional[str] = None,
+    area_code: Optional[str] = None,
+    temp_city_code: Optional[str] = None,
+    station: Optional[str] = None,
+) -> Dict[str, Any]:
+    """In-process entry point (same env defaults and JMA -> Open-Meteo fallback as the CLI)."""
+    provider = provider or os.getenv("WEATHER_PROVIDER", "jma")
+    office_code = office_code or os.getenv("JMA_OFFICE_CODE", "140000")
+    area_code = area_code or os.getenv("JMA_AREA_CODE") or None
+    temp_city_code = temp_city_code or os.getenv("JMA_TEMP_CITY_CODE") or None
+    station = station or os.getenv("JMA_AMEDAS_STATION") or None
+
+    try:
+        return fetch_weather_snapshot(
+            provider=provider,
+            place=place,
+            lat=lat,
+            lon=lon,
+            tz=tz,
+            office_code=str(office_code),
+            area_code=str(area_code) if area_code else None,
+            temp_city_code=str(temp_city_code) if temp_city_code else None,
+            station=str(station) if station else None,
+        )
+    except Exception as e:
+        # If Japan-first fails, fallback to Open-Meteo unless provider was explicitly open-meteo.
+        if provider == "jma":
+            snap = fetch_open_meteo_snapshot(place, lat, lon, tz)
+            snap["jma_fallback_error"] = repr(e)
+            return snap
+        raise
+
+
 def main(argv: Optional[list[str]] = None) -> int:
+    import argparse  # CLI only: keeps in-process importers (generate_talk) from paying for it
+
     p = argparse.ArgumentParser()
     p.add_argument("--place", default="Yokosuka, JP")
     p.add_argument("--lat", type=float, default=35.2813)
@@ -491,27 +641,19 @@ def main(argv: Optional[list[str]] = None) -> int:
 
     args = p.parse_args(argv)
 
-    try:
-        snap = fetch_weather_snapshot(
-            provider=args.provider,
-            place=args.place,
-            lat=args.lat,
-            lon=args.lon,
-            tz=args.tz,
-            office_code=str(args.jma_office_code),
-            area_code=str(args.jma_area_code) if args.jma_area_code else None,
-            temp_city_code=str(args.jma_temp_city_code) if args.jma_temp_city_code else None,
-            station=str(args.jma_amedas_station) if args.jma_amedas_station else None,
-        )
-    except Exception as e:
-        # If Japan-first fails, fallback to Open-Meteo unless provider was explicitly open-meteo.
-        if args.provider == "jma":
-            snap = fetch_open_meteo_snapshot(args.place, args.lat, args.lon, args.tz)
-            snap["jma_fallback_error"] = repr(e)
-        else:
-            raise
-
-    out = json.dumps(snap, ensure_ascii=False, indent=2)
+    snap = fetch_snapshot(
+        place=args.place,
+        lat=args.lat,
+        lon=args.lon,
+        tz=args.tz,
+        provider=args.provider,
+        office_code=args.jma_office_code,
+        area_code=args.jma_area_code,
+        temp_city_code=args.jma_temp_city_code,
+        station=args.jma_amedas_station,
+    )
+
+    out = _dumps(snap, indent=True)
     if args.out and args.out != "-":
         Path(args.out).write_text(out + "\n", encoding="utf-8")
     else:
@@ -6,7 +6,7 @@ This is a Python port of `scripts/generate_diary.sh`.
 
 Behavior summary (keeps the bash contract):
 - Reads env vars (LAT/LON required; many optional with defaults)
-- Fetches a live weather snapshot via `scripts/fetch_weather.py`
+- Fetches a live weather snapshot via `scripts/fetch_weather.py` (imported in-process)
 - Waits for backend `/rag/status`, triggers `/rag/reindex` if empty
 - Calls `/rag/query` to generate today's tweet text (with retries)
 - Writes:
@@ -20,7 +20,7 @@ The output path contract matches the bash script:
   FEED_PATH={FEED_PATH}/feed/feed_{now_local}.json
   LATEST_PATH={LATEST_PATH:-frontend/app/public/latest.json}
 
-Stdlib-only.
+Stdlib-only (httpx is used for connection reuse when it happens to be installed).
 """
 
 from __future__ import annotations
@@ -35,12 +35,27 @@ import random
 import urllib.error
 import urllib.parse
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from zoneinfo import ZoneInfo
 
+try:  # optional: pooled keep-alive connections when httpx is installed
+    import httpx
+except ImportError:
+    httpx = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import fetch_weather  # noqa: E402  (sibling script, stdlib-only)
+
+
+def _dump_file_bytes(obj: Any) -> bytes:
+    """Pretty JSON file body (indent=2, trailing newline) as UTF-8 bytes."""
+    return (fetch_weather._dumps(obj, indent=True) + "\n").encode("utf-8")
+
 
 # -----------------------------
 # Utilities
@@ -62,19 +77,39 @@ def utc_now_iso_z() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
 
 
+_TZ_CACHE: Dict[str, ZoneInfo] = {}
+
+
+def get_tz(tz_name: str) -> ZoneInfo:
+    tz = _TZ_CACHE.get(tz_name)
+    if tz is None:
+        tz = _TZ_CACHE[tz_name] = ZoneInfo(tz_name)
+    return tz
+
+
+def _stamp(d: datetime, suffix: str) -> str:
+    # Same as d.strftime("%Y%m%d_%H%M%S_<suffix>") without the strftime call.
+    return f"{d.year:04d}{d.month:02d}{d.day:02d}_{d.hour:02d}{d.minute:02d}{d.second:02d}_{suffix}"
+
+
 def local_stamp(tz_name: str) -> str:
     if ZoneInfo is None:
         # Fallback: best-effort (still returns something stable)
-        return datetime.now().strftime("%Y%m%d_%H%M%S_LOCAL")
+        return _stamp(datetime.now(), "LOCAL")
     try:
-        dt = datetime.now(ZoneInfo(tz_name))
-        return dt.strftime("%Y%m%d_%H%M%S_%Z")
+        dt = datetime.now(get_tz(tz_name))
+        return _stamp(dt, dt.tzname() or "")
     except Exception:
-        return datetime.now().strftime("%Y%m%d_%H%M%S_LOCAL")
+        return _stamp(datetime.now(), "LOCAL")
+
 
+_PATH_SEP_SPLIT = re.compile(r"\s*:\s*").split
 
-def split_paths(colon_separated: str) -> List[str]:
-    return [p.strip() for p in colon_separated.split(":") if p.strip()]
+
+@lru_cache(maxsize=4)
+def split_paths(colon_separated: str) -> Tuple[str, ...]:
+    # One regex pass splits and trims around each ':'; cached since FEED/LATEST lists repeat.
+    return tuple(p for p in _PATH_SEP_SPLIT(colon_separated.strip()) if p)
 
 
 def normalize_answer(text: str) -> str:
@@ -90,6 +125,10 @@ def parse_possibly_concatenated_json(s: str) -> List[Any]:
     start_candidates = [i for i in (s.find("{"), s.find("[")) if i != -1]
     if start_candidates:
         s = s[min(start_candidates) :]
+    try:
+        return [fetch_weather._loads(s)]  # common case: a single JSON document
+    except ValueError:
+        pass
     dec = json.JSONDecoder()
     objs = []
     while s:
@@ -110,7 +149,40 @@ class HttpConfig:
     bearer_token: str = ""
 
 
-def http_json(method: str, url: str, payload: Optional[Dict[str, Any]], cfg: HttpConfig) -> Dict[str, Any]:
+class _HttpStatusError(Exception):
+    """Non-2xx response from the httpx path; mirrors urllib's HTTPError.read()."""
+
+    def __init__(self, status: int, raw: bytes) -> None:
+        super().__init__(f"HTTP Error {status}")
+        self.code = status
+        self._raw = raw
+
+    def read(self) -> bytes:
+        return self._raw
+
+
+_HTTPX_CLIENT: Any = None
+
+
+def _send(method: str, url: str, headers: Dict[str, str], data: Optional[bytes], timeout_s: float) -> bytes:
+    """Send one request and return the raw body; non-2xx raises with the body readable."""
+    if httpx is None:
+        req = urllib.request.Request(url, method=method.upper(), headers=headers, data=data)
+        with urllib.request.urlopen(req, timeout=timeout_s) as resp:
+            return resp.read()
+
+    global _HTTPX_CLIENT
+    if _HTTPX_CLIENT is None:
+        # One client per process: status/reindex/query calls reuse the same connection.
+        _HTTPX_CLIENT = httpx.Client(headers={"User-Agent": "rag-chat-bot/1.0 (+talk)"})
+    resp = _HTTPX_CLIENT.request(method.upper(), url, headers=headers, content=data, timeout=timeout_s)
+    if resp.status_code >= 400:
+        raise _HttpStatusError(resp.status_code, resp.content)
+    return resp.content
+
+
+def http_json(method: str, url: str, payload: Optional[Dict[str, Any] | bytes], cfg: HttpConfig) -> Dict[str, Any]:
+    """Send `payload` (a dict, or an already-encoded JSON body) and return the JSON response."""
     body = ""
     last_exc: Optional[BaseException] = None
 
@@ -118,16 +190,14 @@ def http_json(method: str, url: str, payload: Optional[Dict[str, Any]], cfg: Htt
     data: Optional[bytes] = None
     if payload is not None:
         headers["Content-Type"] = "application/json"
-        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        data = payload if isinstance(payload, bytes) else fetch_weather._dumps(payload).encode("utf-8")
     if cfg.bearer_token:
         headers["Authorization"] = f"Bearer {cfg.bearer_token}"
 
     attempts = cfg.retries + 1
     for attempt in range(1, attempts + 1):
         try:
-            req = urllib.request.Request(url, method=method.upper(), headers=headers, data=data)
-            with urllib.request.urlopen(req, timeout=cfg.max_time_s) as resp:
-                raw = resp.read()
+            raw = _send(method, url, headers, data, cfg.max_time_s)
             body = raw.decode("utf-8", errors="replace")
             if cfg.debug:
                 head = body[:200]
@@ -141,7 +211,7 @@ def http_json(method: str, url: str, payload: Optional[Dict[str, Any]], cfg: Htt
                     return last
                 # If last is not dict, still return wrapped
                 return {"_value": last}
-        except urllib.error.HTTPError as e:
+        except (urllib.error.HTTPError, _HttpStatusError) as e:
             # IMPORTANT: read FastAPI error JSON (e.g. {"detail":"..."})
             try:
                 raw = e.read()
@@ -187,32 +257,9 @@ def wait_for_backend(api_base: str, cfg: HttpConfig, tries: int = 60, sleep_s: i
 # Domain logic
 # -----------------------------
 def fetch_weather_snapshot(lat: str, lon: str, tz_name: str, place: str) -> Tuple[str, Dict[str, Any]]:
-    # Calls the existing script (keeps the same behavior/format)
-    cmd = [
-        sys.executable,
-        "scripts/fetch_weather.py",
-        "--format",
-        "json",
-        "--lat",
-        lat,
-        "--lon",
-        lon,
-        "--tz",
-        tz_name,
-        "--place",
-        place,
-    ]
-    # Use subprocess without importing subprocess? It's stdlib; fine.
-    import subprocess
-
-    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    if proc.returncode != 0:
-        raise RuntimeError(f"fetch_weather.py failed: {proc.stderr.strip()}")
-    raw = proc.stdout.strip()
-    try:
-        snap = json.loads(raw) if raw else {}
-    except Exception:
-        snap = {"raw": raw}
+    # Same snapshot/format as `python scripts/fetch_weather.py --format json`, without the extra interpreter.
+    snap = fetch_weather.fetch_snapshot(place=place, lat=float(lat), lon=float(lon), tz=tz_name)
+    raw = fetch_weather._dumps(snap, indent=True)
     return raw, snap
 
 
@@ -277,6 +324,11 @@ def _weather_hint(cur: Dict[str, Any]) -> str:
     return ", ".join(tags) if tags else "unknown"
 
 
+def _stable_seed(key: str) -> int:
+    # Non-cryptographic use (PRNG seed), so a short blake2b digest is enough.
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=4).digest(), "big")
+
+
 def pick_topic(now_local: datetime, snap_obj: Dict[str, Any]) -> Tuple[str, str]:
     """
     Pick topic as (family, mode) where family ∈ {event, place, chat}.
@@ -336,7 +388,7 @@ def pick_topic(now_local: datetime, snap_obj: Dict[str, Any]) -> Tuple[str, str]
 
     # Deterministic per-hour, but still "random" and condition-aware
     seed_str = f"{now_local.strftime('%Y-%m-%d-%H')}|{season}|{tod}|{hint}|{code}"
-    seed = int(hashlib.sha256(seed_str.encode("utf-8")).hexdigest()[:8], 16)
+    seed = _stable_seed(seed_str)
     rng = random.Random(seed)
 
     families = list(family_w.keys())
@@ -451,6 +503,8 @@ def build_payload(
     datetime: str | None = None,
     links: list[str] | None = None,
 ) -> dict:
+    # Values are coerced once where they are read from env; no re-casting here.
+    assert type(top_k) is int and type(max_words) is int and type(include_debug) is bool
     # Keep current bash behavior: send snapshot as extra_context string;
     payload = {
         "question": question,
@@ -467,9 +521,22 @@ def build_payload(
     return payload
 
 
+# Where a tweet may live in a response; `answer` is what /rag/query returns today.
+_TWEET_KEYS = ("answer", "text", "output")
+
+
 def extract_tweet(resp_obj: Dict[str, Any]) -> str:
-    ans = (resp_obj.get("answer") or "").strip()
-    return normalize_answer(ans)
+    # Top-level keys first, then the same keys under a nested "result" object.
+    for src in (resp_obj, resp_obj.get("result")):
+        if type(src) is not dict:
+            continue
+        for k in _TWEET_KEYS:
+            v = src.get(k)
+            if type(v) is str:
+                ans = v.strip()
+                if ans:
+                    return normalize_answer(ans)
+    return ""
 
 def extract_links(resp_obj: Any) -> List[str]:
     if not isinstance(resp_obj, dict):
@@ -487,12 +554,23 @@ def extract_links(resp_obj: Any) -> List[str]:
 def extract_detail(resp_obj: Dict[str, Any]) -> str:
     d = resp_obj.get("detail")
     if isinstance(d, (list, dict)):
-        return json.dumps(d, ensure_ascii=False)
+        return fetch_weather._dumps(d)
     if d is None:
         return ""
     return str(d)
 
 
+def extract_tweet_or_detail(resp_obj: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    """(tweet, None) for a usable answer, else ("", backend detail).
+
+    The detail is only formatted when there is no tweet to report.
+    """
+    tweet = extract_tweet(resp_obj)
+    if tweet:
+        return tweet, None
+    return "", extract_detail(resp_obj)
+
+
 def build_entry(today: str, now_iso: str, tweet: str, place: str, snap_obj: Dict[str, Any], links: Optional[List[str]] = None) -> Dict[str, Any]:
     if not today or not now_iso or not tweet:
         missing = [k for k, v in [("today", today), ("now_iso", now_iso), ("tweet", tweet)] if not v]
@@ -527,39 +605,42 @@ def to_item(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     }
 
 
-def write_outputs(feed_path: str, latest_path: str, entry: Dict[str, Any], snap_json_raw: str, now_local: str) -> None:
-    fp = Path(feed_path)
-    lp = Path(latest_path)
-
-    fp.parent.mkdir(parents=True, exist_ok=True)
-    lp.parent.mkdir(parents=True, exist_ok=True)
+def write_all_outputs(
+    pairs: List[Tuple[str, str]], entry: Dict[str, Any], snap_json_raw: str, now_local: str
+) -> List[Path]:
+    """Write feed/latest/snapshot files for every (feed, latest) pair.
 
+    Payloads are serialized once and shared; the independent file writes run
+    in parallel. Destinations shared by several pairs are written once.
+    """
     # Keep a single-item object shape (date/text at top-level) for latest.json compatibility
     item = to_item(entry) or dict(entry)
+    item_bytes = _dump_file_bytes(item)
+    # snap_json_raw is already pretty-printed JSON (fetch_weather_snapshot); write it as-is
+    # instead of a parse -> re-serialize round trip.
+    snap_bytes = (str(snap_json_raw).rstrip() + "\n").encode("utf-8")
 
-    # 1) feed snapshot (per-run)
-    fp.write_text(json.dumps(item, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
-    print(f"Wrote: {fp}")
+    targets: Dict[Path, bytes] = {}
+    for feed_path, latest_path in pairs:
+        fp = Path(feed_path)
+        lp = Path(latest_path)
+        targets.setdefault(fp, item_bytes)  # 1) feed snapshot (per-run)
+        targets.setdefault(lp, item_bytes)  # 2) latest.json
+        # 3) raw weather snapshot next to latest (debug/transparency)
+        targets.setdefault(lp.parent / "snapshot" / f"snapshot_{now_local}.json", snap_bytes)
 
-    # 2) latest.json
-    lp.write_text(json.dumps(item, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
-    print(f"Wrote: {lp}")
+    for parent in {p.parent for p in targets}:
+        parent.mkdir(parents=True, exist_ok=True)
 
-    # 3) raw weather snapshot next to latest (debug/transparency)
-    snap_path = lp.parent / "snapshot" / f"snapshot_{now_local}.json"
-    snap_path.parent.mkdir(parents=True, exist_ok=True)
-    try:
-        snap_obj = json.loads(snap_json_raw)
-        snap_path.write_text(json.dumps(snap_obj, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
-    except Exception:
-        snap_path.write_text(str(snap_json_raw).rstrip() + "\n", encoding="utf-8")
+    with ThreadPoolExecutor(max_workers=min(8, len(targets))) as pool:
+        list(pool.map(lambda kv: kv[0].write_bytes(kv[1]), targets.items()))
+
+    for p in targets:
+        print(f"Wrote: {p}")
+    return list(targets)
 
-    print(f"Wrote: {fp}")
-    print(f"Wrote: {lp}")
-    print(f"Wrote: {snap_path}")
-    return fp, lp, snap_path
 
-def pair_paths(feeds: List[str], latests: List[str]) -> List[Tuple[str, str]]:
+def pair_paths(feeds: Sequence[str], latests: Sequence[str]) -> List[Tuple[str, str]]:
     if not feeds or not latests:
         raise RuntimeError("FEED_PATHS / LATEST_PATHS resolved to empty.")
     if len(feeds) == len(latests):
@@ -594,7 +675,7 @@ def main() -> int:
     if top_k > 128:
         print(f"ERROR: RAG_TOP_K={top_k} is invalid. Backend requires top_k <= 128.", file=sys.stderr)
         return 1
-    max_words = env("MAX_WORDS", "128") or "128"
+    max_words = int(env("MAX_WORDS", "128") or "128")
     hashtags = env("HASHTAGS", "")
 
     now_local = local_stamp(tz_name)
@@ -640,7 +721,7 @@ def main() -> int:
                 status2 = http_json("GET", f"{api_base}/rag/status", None, cfg)
             except Exception:
                 status2 = {"_error": "failed to re-check status"}
-            print(f"DEBUG: status(after reindex)={json.dumps(status2, ensure_ascii=False)}", file=sys.stderr)
+            print(f"DEBUG: status(after reindex)={fetch_weather._dumps(status2)}", file=sys.stderr)
 
     # Build query URL with location hints (place is NOT a QueryRequest field)
     q = {"place": place, "lat": str(lat), "lon": str(lon), "tz": tz_name}
@@ -658,7 +739,7 @@ def main() -> int:
         pass
 
     # 3) Query backend for today's tweet
-    now_dt_local = datetime.now(ZoneInfo(tz_name))
+    now_dt_local = datetime.now(get_tz(tz_name))
     topic_family, topic_mode = pick_topic(now_local=now_dt_local, snap_obj=snap_obj)
     req_links: list[str] = []
     req_datetime = now_dt_local.isoformat()
@@ -671,24 +752,28 @@ def main() -> int:
         links=req_links,
         datetime=req_datetime,
     )
-    include_debug=1
-    payload = build_payload(
-        question=question,
-        top_k=top_k,
-        snap_json_raw=snap_json_raw,
-        max_words=max_words,
-        include_debug=include_debug,
-        datetime=req_datetime,
-        links=req_links,
+    include_debug = env("INCLUDE_DEBUG", "1") not in ("", "0", "false", "False")
+    payload_json = fetch_weather._dumps(
+        build_payload(
+            question=question,
+            top_k=top_k,
+            snap_json_raw=snap_json_raw,
+            max_words=max_words,
+            include_debug=include_debug,
+            datetime=req_datetime,
+            links=req_links,
+        )
     )
+    # Encoded once; every retry re-sends the same bytes.
+    payload = payload_json.encode("utf-8")
 
     if debug:
-        print(f"DEBUG: JSON_PAYLOAD={json.dumps(payload, ensure_ascii=False)}", file=sys.stderr)
+        print(f"DEBUG: JSON_PAYLOAD={payload_json}", file=sys.stderr)
 
     tweet = ""
     links: List[str] = []
     resp_obj: Dict[str, Any] = {}
-    detail = ""
+    detail: Optional[str] = ""
     # bash: retries are CURL_RETRIES+2 here
     for attempt in range(1, cfg.retries + 2 + 1):
         try:
@@ -697,11 +782,10 @@ def main() -> int:
             print(f"WARN: /rag/query call failed (attempt {attempt}/{cfg.retries+2}). Retrying... err={e!r}", file=sys.stderr)
             time.sleep(2)
             continue
-        
+
         links = extract_links(resp_obj)
 
-        detail = extract_detail(resp_obj)
-        tweet = extract_tweet(resp_obj)
+        tweet, detail = extract_tweet_or_detail(resp_obj)
         if tweet:
             break
 
@@ -716,7 +800,7 @@ def main() -> int:
         if detail:
             print(f"Last backend detail: {detail}", file=sys.stderr)
         print("---- last response ----", file=sys.stderr)
-        print(json.dumps(resp_obj, ensure_ascii=False), file=sys.stderr)
+        print(fetch_weather._dumps(resp_obj), file=sys.stderr)
         return 1
 
     if hashtags and "#" not in tweet:
@@ -727,8 +811,7 @@ def main() -> int:
     now_iso = utc_now_iso_z()
     entry = build_entry(today=today, now_iso=now_iso, tweet=tweet, place=place, snap_obj=snap_obj,links=links)
 
-    for feed_p, latest_p in pair_paths(feeds, latests):
-        write_outputs(feed_p, latest_p, entry=entry, snap_json_raw=snap_json_raw, now_local=now_local)
+    write_all_outputs(pair_paths(feeds, latests), entry=entry, snap_json_raw=snap_json_raw, now_local=now_local)
 
     return 0
 
@@ -1,8 +1,24 @@
 # scripts/snapshot.py
 from __future__ import annotations
+import os
+import shutil
+import tempfile
 import time
 import sys
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# One pooled session per process: repeated fetch_one() calls reuse the connection,
+# and transient gateway errors from the camera host are retried with backoff.
+_SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=("GET",)),
+)
+_SESSION.mount("http://", _adapter)
+_SESSION.mount("https://", _adapter)
 
 def fetch_one(url: str, out_path: str = "snapshot.jpg") -> None:
     # cache buster
@@ -15,15 +31,29 @@ def fetch_one(url: str, out_path: str = "snapshot.jpg") -> None:
         "User-Agent": "snapshot-bot/1.0",
     }
 
-    r = requests.get(url2, headers=headers, timeout=30)
-    r.raise_for_status()
+    # Stream the body straight to disk (64 KiB at a time) instead of holding it in memory.
+    with _SESSION.get(url2, headers=headers, timeout=30, stream=True) as r:
+        r.raise_for_status()
 
-    ctype = r.headers.get("Content-Type", "")
-    if "image" not in ctype:
-        raise RuntimeError(f"Non-image response: Content-Type={ctype}")
+        ctype = r.headers.get("Content-Type", "")
+        if "image" not in ctype:
+            raise RuntimeError(f"Non-image response: Content-Type={ctype}")
 
-    with open(out_path, "wb") as f:
-        f.write(r.content)
+        r.raw.decode_content = True  # undo any Content-Encoding like r.content would
+        # Stream into a temp file next to out_path and swap it in only once the
+        # whole body arrived, so a dropped connection never leaves a truncated JPEG.
+        out_dir = os.path.dirname(os.path.abspath(out_path))
+        fd, tmp_name = tempfile.mkstemp(
+            prefix=os.path.basename(out_path) + ".", suffix=".tmp", dir=out_dir
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(r.raw, f, length=64 * 1024)
+            os.chmod(tmp_name, 0o644)  # mkstemp creates 0600
+            os.replace(tmp_name, out_path)
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
@@ -1,75 +1,246 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
-import argparse
 import json
+import mmap
 import os
 import tempfile
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+try:  # optional: faster JSON when orjson is installed
+  import orjson
+except ImportError:
+  orjson = None
+
+try:  # optional: vectorized sort for very large feeds
+  import numpy as np
+except ImportError:
+  np = None
+
+try:  # optional: zstd for `*.zst` feed paths
+  import zstandard
+except ImportError:
+  zstandard = None
+
+# Below this many items the stdlib sort is already fast enough.
+_NUMPY_SORT_MIN = 4096
+# Small files are cheaper to read() than to map.
+_MMAP_MIN_BYTES = 4096
+
 
 def _now_iso() -> str:
   # Keep it simple: UTC ISO string; UI can display as-is.
   return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
 
+_MKDIR_SEEN: set[Path] = set()
+
+
+def _ensure_dir(path: Path) -> None:
+  """mkdir -p, at most once per directory per process."""
+  if path not in _MKDIR_SEEN:
+    path.mkdir(parents=True, exist_ok=True)
+    _MKDIR_SEEN.add(path)
+
+
+def _is_zst(path: Path) -> bool:
+  return path.suffix == ".zst"
+
+
+def _require_zstd(path: Path) -> None:
+  if _is_zst(path) and zstandard is None:
+    raise RuntimeError(f"{path}: the zstandard package is required for .zst feeds")
+
+
 def _load_json(path: Path) -> Optional[Dict[str, Any]]:
-  if not path.exists():
-    return None
+  # No separate exists() stat: a missing file is just the FileNotFoundError below.
   try:
-    return json.loads(path.read_text(encoding="utf-8"))
+    with open(path, "rb") as f:
+      if _is_zst(path):
+        data = zstandard.ZstdDecompressor().decompress(f.read())
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+      size = os.fstat(f.fileno()).st_size
+      if orjson is None or size < _MMAP_MIN_BYTES:
+        data = f.read()
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+      # Parse straight from the page cache: no read() copy, no UTF-8 decode pass.
+      with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+        return orjson.loads(view)
   except Exception:
     return None
 
 
-def _atomic_write(path: Path, obj: Any) -> None:
+def _feed_pretty() -> bool:
+  # FEED_PRETTY=1 keeps the feed indented for human debugging; compact by default.
+  return os.getenv("FEED_PRETTY", "0").strip() == "1"
+
+
+def _atomic_write(path: Path, obj: Any, durable: bool = True, compact: bool = False) -> None:
   """Write JSON atomically.
 
   Use a *unique* temp file in the same directory.
   This avoids collisions with stale *.tmp files that may be left behind
   (e.g., if a previous run crashed or created root-owned temp files).
+
+  The payload goes out with raw os.write on the temp fd, then os.replace.
+  durable=False skips the fsync (for files that can be rebuilt, e.g. a feed
+  materialized from its JSONL log). compact=True drops the indentation.
+  A `.zst` path is written compact and zstd-compressed.
   """
-  path.parent.mkdir(parents=True, exist_ok=True)
-  data = json.dumps(obj, ensure_ascii=False, indent=2) + "\n"
+  _require_zstd(path)
+  _ensure_dir(path.parent)
+  compact = compact or _is_zst(path)
+  if orjson is not None:
+    opts = orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+    data = orjson.dumps(obj, option=opts if compact else opts | orjson.OPT_INDENT_2)
+  elif compact:
+    data = (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+  else:
+    data = (json.dumps(obj, ensure_ascii=False, indent=2) + "\n").encode("utf-8")
+  if _is_zst(path):
+    data = zstandard.ZstdCompressor(level=3).compress(data)
 
   fd, tmp_name = tempfile.mkstemp(
     prefix=path.name + ".",
     suffix=".tmp",
     dir=str(path.parent),
   )
-  tmp = Path(tmp_name)
   try:
-    with os.fdopen(fd, "w", encoding="utf-8") as f:
-      f.write(data)
+    try:
+      view = memoryview(data)
+      while view:
+        view = view[os.write(fd, view):]
+      if durable:
+        os.fsync(fd)
+    finally:
+      os.close(fd)
+    os.chmod(tmp_name, 0o644)  # mkstemp creates 0600
+    os.replace(tmp_name, path)
+  finally:
+    # If replace() succeeded, tmp path no longer exists.
+    try:
+      if os.path.exists(tmp_name):
+        os.unlink(tmp_name)
+    except Exception:
+      pass
+
+
+def _jsonl_path(feed_path: Path) -> Path:
+  if _is_zst(feed_path):
+    feed_path = feed_path.with_suffix("")  # feed.json.zst -> feed.jsonl
+  return feed_path.with_suffix(".jsonl")
+
+
+def _json_line(obj: Any) -> bytes:
+  if orjson is not None:
+    return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+  return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _append_jsonl(path: Path, entry: Dict[str, Any], seed_from: Path) -> int:
+  """Append one entry to the JSONL log (no read, no rewrite); returns the log size in bytes.
+
+  On first use (empty log) the log is seeded with the items of the feed JSON
+  at `seed_from` (oldest first) so switching an existing feed to JSONL mode
+  keeps its history.
+  """
+  _ensure_dir(path.parent)
+  with open(path, "ab") as f:
+    if f.tell() == 0:
+      seed = list(reversed((_load_json(seed_from) or {}).get("items") or []))
+      if seed:
+        f.write(b"".join(_json_line(it) for it in seed))
+    f.write(_json_line(entry))
+    return f.tell()
+
+
+def _sort_desc_by_date(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+  """Sort items by date string, newest first (numpy argsort for very large feeds)."""
+  if np is None or len(items) <= _NUMPY_SORT_MIN:
+    return sorted(items, key=lambda x: str(x.get("date", "")), reverse=True)
+  dates = np.array([str(x.get("date", "")) for x in items], dtype=str)
+  # Stable-sort the reversed array, then flip back: equal dates keep input order,
+  # exactly like sorted(..., reverse=True) in the small-feed branch.
+  last = len(items) - 1
+  order = np.argsort(dates[::-1], kind="stable")[::-1]
+  return [items[last - i] for i in order]
+
+
+def _env_int(name: str, default: int) -> int:
+  try:
+    return int(os.getenv(name, str(default)))
+  except ValueError:
+    return default
+
+
+def _compact_jsonl(path: Path, items: List[Dict[str, Any]]) -> None:
+  """Atomically rewrite the JSONL log with just `items` (oldest first)."""
+  fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+  try:
+    with os.fdopen(fd, "wb") as f:
+      f.write(b"".join(_json_line(it) for it in reversed(items)))
       f.flush()
       os.fsync(f.fileno())
-    tmp.replace(path)
+    os.chmod(tmp_name, 0o644)
+    os.replace(tmp_name, path)
   finally:
-    # If replace() succeeded, tmp path no longer exists.
     try:
-      if tmp.exists():
-        tmp.unlink()
+      if os.path.exists(tmp_name):
+        os.unlink(tmp_name)
     except Exception:
       pass
 
 
+def _materialize_items(path: Path, limit: int) -> List[Dict[str, Any]]:
+  """Rebuild feed items from the JSONL log: newest write per date wins, sorted desc.
+
+  The log is compacted back to the kept items once it holds more than twice
+  `limit` lines, so it cannot grow without bound.
+  """
+  by_date: Dict[str, Dict[str, Any]] = {}
+  with open(path, "rb") as f:
+    lines = f.read().splitlines()
+  for line in reversed(lines):
+    if not line.strip():
+      continue
+    try:
+      it = orjson.loads(line) if orjson is not None else json.loads(line)
+    except Exception:
+      continue  # tolerate a torn last line
+    if not isinstance(it, dict):
+      continue
+    by_date.setdefault(str(it.get("date") or it.get("id")), it)
+  items = _sort_desc_by_date(list(by_date.values()))
+  items = items[: max(1, limit)]
+  if len(lines) > 2 * max(1, limit):
+    _compact_jsonl(path, items)
+  return items
+
+
 def main() -> int:
+  import argparse  # CLI only; not needed by importers
+
   ap = argparse.ArgumentParser()
-  ap.add_argument("--feed", default="public/feed.json")
+  ap.add_argument("--feed", default="public/feed.json", help="a .zst suffix stores the feed zstd-compressed")
   ap.add_argument("--latest", default="public/latest.json")
   ap.add_argument("--date", required=True, help="YYYY-MM-DD")
   ap.add_argument("--text", required=True)
   ap.add_argument("--place", default="")
-  ap.add_argument("--limit", type=int, default=365)
+  ap.add_argument("--limit", type=int, default=_env_int("FEED_LIMIT", 365))
+  ap.add_argument(
+    "--jsonl",
+    action="store_true",
+    help="append to <feed>.jsonl instead of rewriting the feed JSON (compacted past ~2x --limit lines)",
+  )
+  ap.add_argument("--materialize", action="store_true", help="with --jsonl: also rebuild the feed JSON from <feed>.jsonl")
   args = ap.parse_args()
 
   feed_path = Path(args.feed)
   latest_path = Path(args.latest)
-
-  feed = _load_json(feed_path) or {"items": []}
-  items: List[Dict[str, Any]] = list(feed.get("items") or [])
+  # Fail before reading: a .zst feed that cannot be decoded would otherwise load as empty.
+  _require_zstd(feed_path)
 
   entry: Dict[str, Any] = {
     "id": args.date,
@@ -78,21 +249,47 @@ def main() -> int:
   }
   if args.place:
     entry["place"] = args.place
+  updated_at = _now_iso()
+
+  if args.jsonl:
+    log_path = _jsonl_path(feed_path)
+    log_size = _append_jsonl(log_path, entry, seed_from=feed_path)
+    if not args.materialize and log_size > 2 * max(1, args.limit) * len(_json_line(entry)):
+      # Size says the log is probably past 2x limit lines; this read compacts it if so,
+      # so plain append runs stay bounded too while the common case skips the read.
+      _materialize_items(log_path, args.limit)
+    if args.materialize:
+      feed = _load_json(feed_path) or {"items": []}
+      feed["items"] = _materialize_items(log_path, args.limit)
+      feed["updated_at"] = updated_at
+      if args.place:
+        feed["place"] = args.place
+      # the JSONL log is authoritative
+      _atomic_write(feed_path, feed, durable=False, compact=not _feed_pretty())
+    _atomic_write(latest_path, {"date": args.date, "text": entry["text"], "place": args.place, "updated_at": updated_at})
+    return 0
 
-  # Upsert by id/date
-  items = [it for it in items if str(it.get("id")) != args.date and str(it.get("date")) != args.date]
-  items.append(entry)
+  feed = _load_json(feed_path) or {"items": []}
+
+  # Upsert keyed like _materialize_items (date, else id), so dateless items stay distinct;
+  # an item whose id is --date is replaced too, as before.
+  by_date: Dict[str, Dict[str, Any]] = {
+    str(it.get("date") or it.get("id")): it
+    for it in feed.get("items") or []
+    if str(it.get("id")) != args.date
+  }
+  by_date[args.date] = entry
 
-  # Sort desc by date string
-  items.sort(key=lambda x: str(x.get("date", "")), reverse=True)
+  # Sort desc by date string (input is already sorted, so this is a near-linear timsort pass)
+  items = _sort_desc_by_date(list(by_date.values()))
   items = items[: max(1, args.limit)]
 
   feed["items"] = items
-  feed["updated_at"] = _now_iso()
+  feed["updated_at"] = updated_at
   if args.place:
     feed["place"] = args.place
 
-  _atomic_write(feed_path, feed)
+  _atomic_write(feed_path, feed, compact=not _feed_pretty())
   _atomic_write(latest_path, {"date": args.date, "text": entry["text"], "place": args.place, "updated_at": feed["updated_at"]})
   return 0
 